@@ -1,3 +1,4 @@
+import re
 from dataclasses import dataclass
 
 
@@ -19,6 +20,11 @@ class Paint:
 
 type Action = Goto | Paint
 
+# ドア番号 1 文字、または [色] 1 つにマッチする
+_ACTION_RE = re.compile(r"([0-5])|\[0*([0-5])\]")
+# _ACTION_RE だけからなる文字列全体にマッチする
+_PLAN_RE = re.compile(r"(?:[0-5]|\[0*[0-5]\])*")
+
 
 class Plan:
     def __init__(self, actions: list[Action]):
@@ -26,6 +32,17 @@ class Plan:
 
     @classmethod
     def from_string(cls, plan_str: str) -> "Plan":
+        if not _PLAN_RE.fullmatch(plan_str):
+            # 不正な入力は1文字ずつ走査してエラー箇所を報告する
+            return cls._from_string_scan(plan_str)
+        actions: list[Action] = [
+            Goto(int(door)) if door else Paint(int(color))
+            for door, color in _ACTION_RE.findall(plan_str)
+        ]
+        return cls(actions)
+
+    @classmethod
+    def _from_string_scan(cls, plan_str: str) -> "Plan":
         actions = []
         i = 0
 
@@ -12,14 +12,18 @@ from __future__ import annotations
 
 import argparse
 import json
+import multiprocessing
 from pathlib import Path
 import shutil
 from typing import Any, Dict, List, Optional, Set, Tuple, TypedDict
+
+import numpy as np
 from pysat.formula import CNF as SatCNF
 from pysat.formula import IDPool
-from pysat.card import CardEnc, EncType
 from pysat.solvers import Solver  # type: ignore
 
+from kissat import exactly_one, next_room_table, solve_with_kissat, trace_mismatches, transition_block
+
 
 STARTING_ROOM_ID = 0
 
@@ -61,16 +65,45 @@ def bits2label(b0: bool, b1: bool) -> int:
     return (b0 << 1) | b1
 
 
+def trace_prefix_blocks(job: Tuple[Any, ...]) -> Tuple[np.ndarray, np.ndarray]:
+    """Observation and transition clauses of one trace prefix as int32 literal arrays.
+
+    ``job`` is (plan, results, X_t, M_ids, L_ids, D) with X_t[k, r], M_ids[p, g] and
+    L_ids[r] the ids of X[t,k,r], M[p,g] and the two bits of L[r]. Pure function of
+    the id tables, so it also runs as a pool worker.
+    """
+    pl, rs, X_t, M_ids, L_ids, D = job
+    N = len(L_ids)
+    doors = np.asarray(pl, dtype=np.intp)
+    assert ((0 <= doors) & (doors < D)).all()
+
+    # label consistency with observations: X[t,k,r] -> L[r] == obs, one clause per bit
+    obs = np.asarray(rs, dtype=np.int32)
+    signs = np.stack([(obs >> 1) & 1, obs & 1], axis=-1) * 2 - 1
+    lab = L_ids[None, :, :] * signs[:, None, :]
+    x = np.broadcast_to(X_t[:, :, None], lab.shape)
+    label_block = np.stack([-x, lab], axis=-1).reshape(-1, 2)
+
+    # transitions across K steps, for each (k, r, g):
+    # X[k,r] ∧ M[p,g] -> X[k+1, g] and (linking helps propagation) X[k,r] ∧ X[k+1,g] -> M[p,g]
+    trans_block = transition_block(doors, X_t, M_ids.reshape(N, D, N))
+    return label_block, trans_block
+
+
 def build_cnf_prefix(
     plans: List[List[int]],
     results: List[List[int]],
     N: int,
     prefix_steps: List[int],
     D: int = 6,
+    progress: bool = False,
+    workers: int = 1,
 ) -> Tuple["SatCNF", Dict[str, object]]:
     """Build CNF for the first prefix_steps[t] steps of each plan t.
 
     Returns (cnf, meta) where meta holds IDPool, key sets for decoding, etc.
+    With ``workers > 1`` the per-trace observation/transition clauses of
+    multiple plans are generated in a process pool (see trace_prefix_blocks).
     """
     assert len(plans) == len(results) == len(prefix_steps)
     T_used: List[int] = []
@@ -97,94 +130,83 @@ def build_cnf_prefix(
             d_to = pl[i]
             l_to = rs[i + 1]
             local_window[l].add((l_from, d_from, d_to, l_to))
-    for l in range(4):
-        lw = list(local_window[l])
-        print(f"local_window[{l}]: {lw[:5]} ... (total {len(lw)})")
+    if progress:
+        for l in range(4):
+            lw = list(local_window[l])
+            print(f"local_window[{l}]: {lw[:5]} ... (total {len(lw)})")
 
     P = D * N
 
-    cnf = SatCNF()
+    # Plain list: SatCNF.append rescans every clause to track nv, which the pool already knows
+    clauses: List[List[int]] = []
     pool = IDPool()
 
-    port_keys: Set[Tuple[int, int]] = set()
-    move_keys: Set[Tuple[int, int]] = set()
-    loc_keys: Set[Tuple[int, int, int]] = set()
+    # Variables
+    # どの変数も一度しか確保しないので、キー無しの pool.id() で採番して id 表に持つ。
+    # (キー付きの pool.id(("M", p, g)) は呼ぶたびにタプルの生成とハッシュがかかる)
+    # L[r]: 部屋rのラベルの２ビット。L_ids[r] がその変数 id
+    L_ids: List[Optional[Tuple[int, int]]] = [None] * N
 
-    # Variable helpers
-    # L[r]: 部屋rのラベルを２ビットで返す。
-    def v_label(rid: int) -> tuple[int, int]:
-        return pool.id(("L", rid, 0)), pool.id(("L", rid, 1))
+    # Lp[p]: ポートpのラベルの2ビット。Lp_ids[p] がその変数 id
+    Lp_ids: List[Tuple[int, int]] = []
 
-    # Lp[p]: ポートpのラベルを2ビットで返す。
-    def v_port_label(pid: int) -> tuple[int, int]:
-        return pool.id(("Lp", pid, 0)), pool.id(("Lp", pid, 1))
+    # P[p, q]: ポートpがqと繋がっている (p <= q)。PM[p, q] == PM[q, p] がその変数 id
+    PM = np.zeros((P, P), dtype=np.int32)
 
-    # P[p, q]: ポートpがqと繋がっている (p < q)
-    def v_port(p: int, q: int) -> int:
-        # symmetric variable id for pair (p,q)
-        a, b = (p, q) if p <= q else (q, p)
-        port_keys.add((a, b))
-        return pool.id(("P", a, b))
+    # M[p, g]: ポートpから部屋gに移動可能。M_ids[p][g] がその変数 id
+    M_ids: List[List[int]] = []
 
-    # M[p, g]: ポートpから部屋gに移動可能
-    def v_move(p: int, g: int) -> int:
-        move_keys.add((p, g))
-        return pool.id(("M", p, g))
-
-    # X[t, k, r]: trace tの時刻kに部屋rにいる
-    def v_loc(tid: int, k: int, rid: int) -> int:
-        loc_keys.add((tid, k, rid))
-        return pool.id(("X", tid, k, rid))
+    # X[t, k, r]: trace tの時刻kに部屋rにいる。X_all[t][k][r] がその変数 id
 
     # == ビット等号（XNOR）の補助変数 ==
-    def lit_xnor(a, b, tag):
-        z = pool.id((tag, a, b))
-        cnf.append([z, a, b])
-        cnf.append([z, -a, -b])
-        cnf.append([-z, a, -b])
-        cnf.append([-z, -a, b])
+    def lit_xnor(a, b):
+        z = pool.id()
+        clauses.append([z, a, b])
+        clauses.append([z, -a, -b])
+        clauses.append([-z, a, -b])
+        clauses.append([-z, -a, b])
         return z
 
     # == 2bit 等号 ==
-    def lit_eq2(a1, a0, b1, b0, tag):
-        e1 = lit_xnor(a1, b1, (tag, "xnor1"))
-        e0 = lit_xnor(a0, b0, (tag, "xnor0"))
-        z = pool.id((tag, "eq2"))
+    def lit_eq2(a1, a0, b1, b0):
+        e1 = lit_xnor(a1, b1)
+        e0 = lit_xnor(a0, b0)
+        z = pool.id()
         # z <-> (e1 ∧ e0)
-        cnf.append([-z, e1])
-        cnf.append([-z, e0])
-        cnf.append([z, -e1, -e0])
+        clauses.append([-z, e1])
+        clauses.append([-z, e0])
+        clauses.append([z, -e1, -e0])
         return z
 
     # == 2bit 厳密比較 a<b ==
-    def lit_lt2(a1, a0, b1, b0, tag):
+    def lit_lt2(a1, a0, b1, b0):
         # (a1<b1) ∨ (a1==b1 ∧ a0<b0)
-        l1 = pool.id((tag, "l1"))  # ¬a1 ∧ b1
-        cnf.append([-l1, -a1])
-        cnf.append([-l1, b1])
+        l1 = pool.id()  # ¬a1 ∧ b1
+        clauses.append([-l1, -a1])
+        clauses.append([-l1, b1])
 
-        e1 = lit_xnor(a1, b1, (tag, "xnor1"))
-        l0 = pool.id((tag, "l0"))  # ¬a0 ∧ b0
-        cnf.append([-l0, -a0])
-        cnf.append([-l0, b0])
+        e1 = lit_xnor(a1, b1)
+        l0 = pool.id()  # ¬a0 ∧ b0
+        clauses.append([-l0, -a0])
+        clauses.append([-l0, b0])
 
-        u = pool.id((tag, "u"))  # u <-> (e1 ∧ l0)
-        cnf.append([-u, e1])
-        cnf.append([-u, l0])
-        cnf.append([u, -e1, -l0])
+        u = pool.id()  # u <-> (e1 ∧ l0)
+        clauses.append([-u, e1])
+        clauses.append([-u, l0])
+        clauses.append([u, -e1, -l0])
 
-        lt = pool.id((tag, "lt"))
+        lt = pool.id()
         # lt <-> (l1 ∨ u)
-        cnf.append([-lt, l1, u])
-        cnf.append([lt, -l1])
-        cnf.append([lt, -u])
+        clauses.append([-lt, l1, u])
+        clauses.append([lt, -l1])
+        clauses.append([lt, -u])
         return lt
 
     # == ガード（ラベル等号の前提）をリテラルとして直に使う ==
     def guard_literals_for_label(r, lab):
         # lab は 0..3。label2bits(l) -> (b0,b1) で既に使っているはず
         b0, b1 = label2bits(lab)
-        v0, v1 = v_label(r)  # 2bit 変数
+        v0, v1 = L_ids[r]  # 2bit 変数
         # 「L[r]==lab」を1本のリテラルにはできないので、
         # clauseガードに使うための“2つの前提リテラル（否定形で使う）”を返す
         lit_ok0 = v0 if b0 else -v0
@@ -199,90 +221,88 @@ def build_cnf_prefix(
     for i in range(0, regular):
         lab = (o + i) % 4
         bits = label2bits(lab)
-        v0, v1 = v_label(i)
-        cnf.append([v0 if bits[0] else -v0])
-        cnf.append([v1 if bits[1] else -v1])
+        v0, v1 = L_ids[i] = (pool.id(), pool.id())
+        clauses.append([v0 if bits[0] else -v0])
+        clauses.append([v1 if bits[1] else -v1])
 
     # (2) Perfect matching on ports using symmetric variables
     for p in range(P):
-        row = [v_port(p, q) for q in range(P)]
-        cnf.extend(
-            CardEnc.equals(
-                lits=row, bound=1, vpool=pool, encoding=EncType.seqcounter
-            ).clauses
-        )
+        # row p owns the ids of pairs (p, q >= p); pairs (q < p, p) were taken by earlier rows
+        for q in range(p, P):
+            PM[p, q] = PM[q, p] = pool.id()
+        row = PM[p].tolist()
+        clauses.extend(exactly_one(row, pool))
 
     # (2a) Lp[p] はリンク先の部屋のラベルと一致する
     # つまり、M[p, g] -> Lp[p] == L[g]
+    # id は M[p, g], Lp[p], L[g] の初出順に確保する
     for p in range(P):
+        M_row: List[int] = []
         for g in range(N):
-            m = v_move(p, g)
-            v0p, v1p = v_port_label(p)
-            v0g, v1g = v_label(g)
-            cnf.append([-m, v0p, -v0g])
-            cnf.append([-m, v1p, -v1g])
-            cnf.append([-m, -v0p, v0g])
-            cnf.append([-m, -v1p, v1g])
+            m = pool.id()
+            M_row.append(m)
+            if g == 0:
+                Lp_ids.append((pool.id(), pool.id()))
+            if L_ids[g] is None:
+                L_ids[g] = (pool.id(), pool.id())
+            v0p, v1p = Lp_ids[p]
+            v0g, v1g = L_ids[g]  # type: ignore[misc]
+            clauses.append([-m, v0p, -v0g])
+            clauses.append([-m, v1p, -v1g])
+            clauses.append([-m, -v0p, v0g])
+            clauses.append([-m, -v1p, v1g])
+        M_ids.append(M_row)
 
     # (3) Movement possibility M[p,g] linked to OR_d P[p, D*g + d]
+    PM_rows = PM.tolist()
     for p in range(P):
         for g in range(N):
-            m = v_move(p, g)
+            m = M_ids[p][g]
             ors: List[int] = []
             base = D * g
             for d in range(D):
                 to_p = base + d
-                u = v_port(p, to_p)
+                u = PM_rows[p][to_p]
                 ors.append(u)
                 # (¬U -> M)
-                cnf.append([-u, m])
+                clauses.append([-u, m])
             # (¬M -> OR U)
-            cnf.append([-m] + ors)
+            clauses.append([-m] + ors)
 
     # (4) Trace prefix encoding
+    # X 変数と exactly-one はここで逐次に作り、観測・遷移の節は trace_prefix_blocks が作る
+    heads: List[List[List[int]]] = []
+    X_all: List[List[List[int]]] = []
     for tid, (pl, rs, K) in enumerate(zip(used_plans, used_results, T_used)):
+        head: List[List[int]] = []
         # X variables and exactly-one per time
         X_t: List[List[int]] = []
         for k in range(K + 1):
-            lits = [v_loc(tid, k, r) for r in range(N)]
-            cnf.extend(
-                CardEnc.equals(
-                    lits=lits, bound=1, vpool=pool, encoding=EncType.seqcounter
-                ).clauses
-            )
+            lits = [pool.id() for _ in range(N)]
+            head.extend(exactly_one(lits, pool))
             X_t.append(lits)
 
         # start location fixed
-        cnf.append([v_loc(tid, 0, STARTING_ROOM_ID)])
-
-        # label consistency with observations
-        for k in range(K + 1):
-            obs = int(rs[k])
-            for r in range(N):
-                # X[t,k,r] -> L[r] == obs
-                obs_bits = label2bits(obs)
-                v0, v1 = v_label(r)
-                if obs_bits[0]:
-                    cnf.append([-v_loc(tid, k, r), v0])
-                else:
-                    cnf.append([-v_loc(tid, k, r), -v0])
-                if obs_bits[1]:
-                    cnf.append([-v_loc(tid, k, r), v1])
-                else:
-                    cnf.append([-v_loc(tid, k, r), -v1])
-
-        # transitions across K steps
-        for k in range(K):
-            a = int(pl[k])
-            assert 0 <= a < D
-            for r in range(N):
-                p = r * D + a
-                for g in range(N):
-                    m = v_move(p, g)
-                    # X[k,r] ∧ M[p,g] -> X[k+1, g]
-                    cnf.append([-v_loc(tid, k, r), -m, v_loc(tid, k + 1, g)])
-                    # Linking helps propagation
-                    cnf.append([-v_loc(tid, k, r), -v_loc(tid, k + 1, g), m])
+        head.append([X_t[0][STARTING_ROOM_ID]])
+        heads.append(head)
+        X_all.append(X_t)
+
+    # 残りの trace ごとの節は上の id 表しか読まないので、trace 間で独立
+    M_arr = np.array(M_ids, dtype=np.int32)
+    L_arr = np.array(L_ids, dtype=np.int32).reshape(N, 2)
+    jobs = [
+        (pl, rs, np.array(X_t, dtype=np.int32), M_arr, L_arr, D)
+        for pl, rs, X_t in zip(used_plans, used_results, X_all)
+    ]
+    if workers > 1 and len(jobs) > 1:
+        with multiprocessing.Pool(processes=min(workers, len(jobs))) as procs:
+            blocks = procs.map(trace_prefix_blocks, jobs)
+    else:
+        blocks = map(trace_prefix_blocks, jobs)
+    for head, (label_block, trans_block) in zip(heads, blocks):
+        clauses.extend(head)
+        clauses.extend(label_block.tolist())
+        clauses.extend(trans_block.tolist())
 
     # (6) Local window constraints
     # 各ラベルlに対して、 l_from -d_from:?-> l -d_to:?-> l_to という形の(l_from, d_from, d_to, l_to)のそれぞれのくみに対して
@@ -303,8 +323,8 @@ def build_cnf_prefix(
     #     a0, a1 = v_port_label(p)
     #     b0, b1 = label2bits(label)
     #     # 片方向のみ
-    #     cnf.append([-z, a0 if b0 else -a0])
-    #     cnf.append([-z, a1 if b1 else -a1])
+    #     clauses.append([-z, a0 if b0 else -a0])
+    #     clauses.append([-z, a1 if b1 else -a1])
     #     return z
 
     # def lit_eq_l_guarded(r, label):
@@ -312,8 +332,8 @@ def build_cnf_prefix(
     #     z = pool.id(("EQ_L_G", r, label))
     #     v0, v1 = v_label(r)
     #     b0, b1 = label2bits(label)
-    #     cnf.append([-z, v0 if b0 else -v0])
-    #     cnf.append([-z, v1 if b1 else -v1])
+    #     clauses.append([-z, v0 if b0 else -v0])
+    #     clauses.append([-z, v1 if b1 else -v1])
     #     return z
 
     # for l in range(4):
@@ -327,12 +347,12 @@ def build_cnf_prefix(
 
     #             # (1) w -> L[q] == l
     #             zL = lit_eq_l_guarded(q, l)
-    #             cnf.append([-w, zL])
+    #             clauses.append([-w, zL])
 
     #             # (2) w -> Lp[q, d_to] == l_to
     #             p_to = q * D + d_to
     #             z_to = lit_eq_lp_guarded(p_to, l_to)
-    #             cnf.append([-w, z_to])
+    #             clauses.append([-w, z_to])
 
     #             # (3) w -> ∨_d (Lp[q,d] == l_from)
     #             or_lits = []
@@ -340,10 +360,10 @@ def build_cnf_prefix(
     #             for d in range(D):
     #                 z_from_d = lit_eq_lp_guarded(base + d, l_from)
     #                 or_lits.append(z_from_d)
-    #             cnf.append([-w] + or_lits)
+    #             clauses.append([-w] + or_lits)
 
     #         # 存在：∨_q W[idx,q]
-    #         cnf.append(Wq)
+    #         clauses.append(Wq)
 
     # (7) Symmetry breaking for port labels
     # 各ラベルlについて、ラベルlの部屋1 < r1 < r2に対して
@@ -361,47 +381,52 @@ def build_cnf_prefix(
                 eq = []
                 lt = []
                 for d in range(D):
-                    a0, a1 = v_port_label(r1 * D + d)
-                    b0, b1 = v_port_label(r2 * D + d)
-                    eq_d = lit_eq2(a1, a0, b1, b0, ("LEX", "EQ", lab, r1, r2, d))
-                    lt_d = lit_lt2(a1, a0, b1, b0, ("LEX", "LT", lab, r1, r2, d))
+                    a0, a1 = Lp_ids[r1 * D + d]
+                    b0, b1 = Lp_ids[r2 * D + d]
+                    eq_d = lit_eq2(a1, a0, b1, b0)
+                    lt_d = lit_lt2(a1, a0, b1, b0)
                     eq.append(eq_d)
                     lt.append(lt_d)
 
                 # prefix 等号
                 pref: list[int] = [-1] * D
                 for d in range(D):
-                    z = pool.id(("LEX", "PREF", lab, r1, r2, d))
-                    cnf.append([-z, eq[d]])
+                    z = pool.id()
+                    clauses.append([-z, eq[d]])
                     if d > 0:
-                        cnf.append([-z, pref[d - 1]])
-                        cnf.append([z, -eq[d], -pref[d - 1]])
+                        clauses.append([-z, pref[d - 1]])
+                        clauses.append([z, -eq[d], -pref[d - 1]])
                     else:
-                        cnf.append([z, -eq[d]])
+                        clauses.append([z, -eq[d]])
                     pref[d] = z
 
                 # lex ≤ ： pref[5] ∨ lt[0] ∨ (pref[0]∧lt[1]) ∨ … ∨ (pref[4]∧lt[5])
                 terms = [lt[0]]
                 for d in range(1, D):
-                    t = pool.id(("LEX", "TERM", lab, r1, r2, d))
-                    cnf.append([-t, pref[d - 1]])
-                    cnf.append([-t, lt[d]])
-                    cnf.append([t, -pref[d - 1], -lt[d]])
+                    t = pool.id()
+                    clauses.append([-t, pref[d - 1]])
+                    clauses.append([-t, lt[d]])
+                    clauses.append([t, -pref[d - 1], -lt[d]])
                     terms.append(t)
 
                 # ガード付き大OR
                 head = [-g1a, -g1b, -g2a, -g2b, pref[D - 1]] + terms
-                cnf.append(head)
+                clauses.append(head)
 
-    cnf.nv = max(getattr(cnf, "nv", 0) or 0, pool.top)
-    print(f"CNF variables: {cnf.nv}, clauses: {len(cnf.clauses)}")
+    cnf = SatCNF()
+    cnf.clauses = clauses
+    cnf.nv = pool.top
+    if progress:
+        print(f"CNF variables: {cnf.nv}, clauses: {len(cnf.clauses)}")
 
     meta = {
         "N": N,
         "D": D,
         "P": P,
         "pool": pool,
-        "port_keys": port_keys,
+        "PM": PM,
+        # L_ids[r] = ids of the two label bits of room r
+        "L_ids": L_arr,
     }
     return cnf, meta
 
@@ -447,41 +472,42 @@ def solve_with_kissat_external(
     seed: Optional[int] = None,
 ) -> Tuple[str, Dict[int, bool]]:
     """Use local kissat.py wrapper to solve via external Kissat binary."""
-    import kissat as kissat_mod  # local module providing the wrapper
-
-    return kissat_mod.solve_with_kissat(
+    status, values = solve_with_kissat(
         cnf, time_limit_s=time_limit_s, progress=progress, seed=seed
     )
+    # the wrapper returns a 0/1 bytearray indexed by variable id
+    return status, {var: val == 1 for var, val in enumerate(values) if var}
 
 
 def extract_solution(meta: Dict[str, object], assign: Dict[int, bool]) -> Solution:
-    N = int(meta["N"])  # type: ignore[index]
     D = int(meta["D"])  # type: ignore[index]
-    pool: IDPool = meta["pool"]  # type: ignore[index]
-    port_keys: Set[Tuple[int, int]] = meta["port_keys"]  # type: ignore[index]
+    PM: np.ndarray = meta["PM"]  # type: ignore[index]
+    L_ids: np.ndarray = meta["L_ids"]  # type: ignore[index]
+
+    # dense truth table over every id the decoding reads (unassigned ids are false)
+    top = int(max(PM.max(initial=0), L_ids.max(initial=0)))
+    values = np.zeros(top + 1, dtype=bool)
+    vars_ = np.fromiter(assign.keys(), dtype=np.int64, count=len(assign))
+    vals = np.fromiter(assign.values(), dtype=bool, count=len(assign))
+    in_range = vars_ <= top
+    values[vars_[in_range]] = vals[in_range]
 
     # labels
-    rooms: List[int] = []
-    for r in range(N):
-        lab_val = None
-        b0 = assign.get(pool.id(("L", r, 0)), False)
-        b1 = assign.get(pool.id(("L", r, 1)), False)
-        lab_val = bits2label(b0, b1)
-        rooms.append(int(lab_val))
-
-    # connections
+    bits = values[L_ids]
+    rooms: List[int] = ((bits[:, 0].astype(int) << 1) | bits[:, 1]).tolist()
+
+    # connections: true P[a, b] with a <= b
+    pairs = np.argwhere(np.triu(values[PM]))
     connections: List[Dict[str, Dict[str, int]]] = []
-    for a, b in port_keys:
-        var = pool.id(("P", a, b))
-        if assign.get(var, False):
-            ri, di = divmod(a, D)
-            rj, dj = divmod(b, D)
-            connections.append(
-                {
-                    "from": {"room": int(ri), "door": int(di)},
-                    "to": {"room": int(rj), "door": int(dj)},
-                }
-            )
+    for a, b in pairs.tolist():
+        ri, di = divmod(a, D)
+        rj, dj = divmod(b, D)
+        connections.append(
+            {
+                "from": {"room": int(ri), "door": int(di)},
+                "to": {"room": int(rj), "door": int(dj)},
+            }
+        )
     connections.sort(
         key=lambda e: (
             e["from"]["room"],
@@ -530,8 +556,14 @@ def verify_solution(
     if len(labels) != N:
         errs.append(f"rooms length mismatch: got {len(labels)} want {N}")
 
-    # simulate
+    # simulate; only traces the compiled walk rejects are replayed for messages
+    fast = 0 < N == len(labels)
+    if fast:
+        next_room = next_room_table(match, D)
+        labels_arr = np.asarray(labels, dtype=np.int32)
     for idx, (pl, rs) in enumerate(zip(plans, results)):
+        if fast and len(rs) > len(pl) and trace_mismatches(next_room, labels_arr, pl, rs, D) == 0:
+            continue
         cur = STARTING_ROOM_ID
         if labels and labels[cur] != int(rs[0]):
             errs.append(f"plan {idx} step 0: label mismatch at room {cur}")
@@ -559,6 +591,7 @@ def cegis_sat(
     time_limit_s: Optional[float] = None,
     verbose: bool = True,
     backend: str = "auto",  # auto|kissat|pysat
+    workers: int = 1,
 ) -> Tuple[Optional[Solution], Dict[str, object]]:
     # initialize per-trace prefixes
     prefixes = [max(20, len(pl)) for pl in plans]
@@ -574,7 +607,9 @@ def cegis_sat(
         if chosen not in ("kissat", "pysat"):
             raise ValueError(f"unknown backend: {chosen}")
 
-        cnf, meta = build_cnf_prefix(plans, results, N, prefixes)
+        cnf, meta = build_cnf_prefix(
+            plans, results, N, prefixes, progress=verbose, workers=workers
+        )
         if chosen == "kissat":
             status, assign = solve_with_kissat_external(
                 cnf, time_limit_s=time_limit_s, progress=verbose
@@ -673,6 +708,13 @@ def main() -> None:
         default="auto",
         help="SAT backend to use",
     )
+    parser.add_argument(
+        "--workers",
+        "-j",
+        type=int,
+        default=1,
+        help="Worker processes for per-trace clause generation",
+    )
     args = parser.parse_args()
 
     prob = load_problem(args.input)
@@ -688,6 +730,7 @@ def main() -> None:
         max_iters=args.iters,
         verbose=not args.quiet,
         backend=args.backend,
+        workers=args.workers,
     )
     if out is None:
         print("CEGIS failed:", meta)
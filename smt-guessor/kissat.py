@@ -11,22 +11,531 @@ Usage: python -m smt-guessor.kissat --input in.json --output out.json [--time 60
 from __future__ import annotations
 
 import argparse
+import gzip
+import io
+import itertools
 import json
+import math
+import multiprocessing
 import os
+import queue
+import re
 import subprocess
 import sys
 import tempfile
-from typing import Dict, List, Literal, Tuple, Optional, Set
+import threading
+from typing import IO, Any, BinaryIO, Dict, Iterable, Iterator, List, Literal, Tuple, Optional, Union
 
+import numpy as np
 from pysat.formula import CNF as SatCNF, IDPool
 from pysat.card import CardEnc, EncType
 
+try:
+    from numba import njit, prange
+
+    _NUMBA_AVAILABLE = True
+except ImportError:
+    _NUMBA_AVAILABLE = False
+    prange = range
+
 
 STARTING_ROOM_ID = 0
+# Model lines of the solver output ("v 1 -2 3 ... 0")
+MODEL_LINE_RE = re.compile(r"^[vV] ([^\n]*)$", re.MULTILINE)
+# Upper bound on clauses generated per vectorized transition block
+TRANSITION_CHUNK = 1 << 20
+# Rows formatted per %-format call when writing literal arrays as DIMACS
+ROW_CHUNK = 1 << 16
+# Extra kissat options cycled through by the members of a --portfolio run
+PORTFOLIO_OPTIONS: List[List[str]] = [
+    [],
+    ["--sat"],
+    ["--unsat"],
+    ["--walkinitially=true"],
+    ["--target=2"],
+    ["--tier1=3"],
+    ["--chrono=false"],
+    ["--stable=0"],
+]
+
+
+def _plan_digits_numpy(buf: np.ndarray) -> Tuple[np.ndarray, int]:
+    """Digit values of an ASCII plan buffer and the index of the first non-digit (-1 if none)."""
+    digits = buf.astype(np.int8) - 48
+    bad = np.flatnonzero((digits < 0) | (digits > 9))
+    return digits, int(bad[0]) if len(bad) else -1
+
+
+def _plan_digits_loop(buf: np.ndarray) -> Tuple[np.ndarray, int]:
+    """Same as _plan_digits_numpy in a single pass (numba kernel)."""
+    digits = np.empty(buf.shape[0], dtype=np.int8)
+    for i in range(buf.shape[0]):
+        c = np.int16(buf[i]) - 48
+        if c < 0 or c > 9:
+            return digits, i
+        digits[i] = c
+    return digits, -1
+
+
+if _NUMBA_AVAILABLE:
+    plan_digits = njit(cache=True)(_plan_digits_loop)
+else:
+    plan_digits = _plan_digits_numpy
 
 
 def normalize_plan(plan: str) -> List[int]:
-    return [int(ch) for ch in plan]
+    digits, bad = plan_digits(np.frombuffer(plan.encode("ascii"), dtype=np.uint8))
+    if bad >= 0:
+        raise ValueError(f"invalid literal for int() with base 10: {plan[bad]!r}")
+    return digits.tolist()
+
+
+# Exactly-one clauses over placeholder ids, keyed by (length, AMO encoding).
+# Ids 1..n stand for the literals, n+1.. for the auxiliary variables.
+_EO_TEMPLATES: Dict[Tuple[int, str], Tuple[List[List[int]], int]] = {}
+AMO_ENCODINGS = ("seqcounter", "product")
+# Below this size the product encoding falls back to pairwise at-most-one
+PRODUCT_BASE_SIZE = 4
+# At-least-k clauses over placeholder ids, keyed by (length, k, encoding)
+_ATLEAST_TEMPLATES: Dict[Tuple[int, int, str], Tuple[List[List[int]], int]] = {}
+# pysat encodings selectable for the balanced-label at-least constraints
+AMK_ENCODINGS = ("seqcounter", "totalizer", "kmtotalizer", "sortnetwrk")
+
+
+def exactly_one_template(n: int) -> Tuple[List[List[int]], int]:
+    """Exactly-one over x_1..x_n as one ALO clause plus a sequential-counter AMO.
+
+    For n >= 3 the counter s_i (ids n+1..2n-1) means "some x_j with j <= i is true"; the
+    at-least-one half is the plain disjunction and needs no counter of its own,
+    so the n-1 auxiliaries are shared by the whole constraint. Clause order
+    matches CardEnc.equals(..., encoding=seqcounter).
+    """
+    if n == 1:
+        return [[1]], 0
+    if n == 2:
+        return [[1, 2], [-1, -2]], 0
+    s = lambda i: n + i
+    clauses = [list(range(1, n + 1)), [-1, s(1)]]
+    for i in range(2, n):
+        clauses += [[-s(i - 1), s(i)], [-i, -s(i - 1)], [-i, s(i)]]
+    clauses.append([-n, -s(n - 1)])
+    return clauses, n - 1
+
+
+def _amo_product(lits: List[int], next_id: int, clauses: List[List[int]]) -> int:
+    """Append Chen's product at-most-one over ``lits``; returns the next free id.
+
+    The literals are laid out on a p x q grid; x in row i / column j implies the
+    row variable u_i and the column variable v_j, and at most one u and one v may
+    hold (recursively). Uses O(sqrt n) auxiliaries instead of n - 1.
+    """
+    n = len(lits)
+    if n <= PRODUCT_BASE_SIZE:
+        clauses += [[-lits[i], -lits[j]] for i in range(n) for j in range(i + 1, n)]
+        return next_id
+    p = math.isqrt(n - 1) + 1
+    q = -(-n // p)
+    u = list(range(next_id, next_id + p))
+    v = list(range(next_id + p, next_id + p + q))
+    next_id += p + q
+    for idx, lit in enumerate(lits):
+        i, j = divmod(idx, q)
+        clauses += [[-lit, u[i]], [-lit, v[j]]]
+    next_id = _amo_product(u, next_id, clauses)
+    return _amo_product(v, next_id, clauses)
+
+
+def exactly_one_product_template(n: int) -> Tuple[List[List[int]], int]:
+    """Exactly-one over x_1..x_n as one ALO clause plus a product-encoded AMO."""
+    clauses = [list(range(1, n + 1))]
+    next_id = _amo_product(list(range(1, n + 1)), n + 1, clauses)
+    return clauses, next_id - n - 1
+
+
+def exactly_one(lits: List[int], pool: IDPool, encoding: str = "seqcounter") -> List[List[int]]:
+    """Exactly-one clauses over ``lits``, instantiated from a cached template."""
+    n = len(lits)
+    key = (n, encoding)
+    if key not in _EO_TEMPLATES:
+        if encoding == "product":
+            _EO_TEMPLATES[key] = exactly_one_product_template(n)
+        elif encoding == "seqcounter":
+            _EO_TEMPLATES[key] = exactly_one_template(n)
+        else:
+            raise ValueError(f"unknown at-most-one encoding: {encoding}")
+    return instantiate_template(*_EO_TEMPLATES[key], lits, pool)
+
+
+def at_least(lits: List[int], bound: int, pool: IDPool, encoding: str = "seqcounter") -> List[List[int]]:
+    """CardEnc.atleast(..., encoding) clauses, encoded once per (length, bound, encoding)."""
+    n = len(lits)
+    key = (n, bound, encoding)
+    if key not in _ATLEAST_TEMPLATES:
+        if encoding not in AMK_ENCODINGS:
+            raise ValueError(f"unknown at-least-k encoding: {encoding}")
+        enc = CardEnc.atleast(
+            lits=list(range(1, n + 1)), bound=bound, top_id=n, encoding=getattr(EncType, encoding)
+        )
+        _ATLEAST_TEMPLATES[key] = (enc.clauses, max(enc.nv - n, 0))
+    return instantiate_template(*_ATLEAST_TEMPLATES[key], lits, pool)
+
+
+def instantiate_template(
+    template: List[List[int]], num_aux: int, lits: List[int], pool: IDPool
+) -> List[List[int]]:
+    """Rename placeholder ids to ``lits`` followed by ``num_aux`` fresh pool variables."""
+    ids = [0] + list(lits) + [pool.id() for _ in range(num_aux)]
+    return [[ids[l] if l > 0 else -ids[-l] for l in clause] for clause in template]
+
+
+def _transition_block_numpy(doors: np.ndarray, X_arr: np.ndarray, M_grid: np.ndarray) -> np.ndarray:
+    """Transition clauses for len(doors) steps; X_arr holds the len(doors)+1 location rows.
+
+    For each step t, room k and next room g emits, in this order,
+    [-x[t,k], -M[k,door,g], x[t+1,g]] and [-x[t,k], -x[t+1,g], M[k,door,g]].
+    """
+    # m[t, from_rid, to_rid] = M_{D*from_rid+doors[t], to_rid}
+    m = M_grid[:, doors, :].transpose(1, 0, 2)
+    x_from = np.broadcast_to(X_arr[:-1, :, None], m.shape)
+    x_to = np.broadcast_to(X_arr[1:, None, :], m.shape)
+    return np.stack([-x_from, -m, x_to, -x_from, -x_to, m], axis=-1).reshape(-1, 3)
+
+
+def _transition_block_loop(doors: np.ndarray, X_arr: np.ndarray, M_grid: np.ndarray) -> np.ndarray:
+    """Same clauses as _transition_block_numpy, written into a preallocated buffer (numba kernel)."""
+    T = doors.shape[0]
+    N = X_arr.shape[1]
+    out = np.empty((2 * T * N * N, 3), dtype=np.int32)
+    i = 0
+    for t in range(T):
+        door = doors[t]
+        for from_rid in range(N):
+            x_from = X_arr[t, from_rid]
+            for to_rid in range(N):
+                m = M_grid[from_rid, door, to_rid]
+                x_to = X_arr[t + 1, to_rid]
+                out[i, 0] = -x_from
+                out[i, 1] = -m
+                out[i, 2] = x_to
+                out[i + 1, 0] = -x_from
+                out[i + 1, 1] = -x_to
+                out[i + 1, 2] = m
+                i += 2
+    return out
+
+
+if _NUMBA_AVAILABLE:
+    transition_block = njit(cache=True)(_transition_block_loop)
+else:
+    transition_block = _transition_block_numpy
+
+
+def _pruning_pairs_numpy(plan_arr: np.ndarray, obs_arr: np.ndarray) -> np.ndarray:
+    """Pruning pairs scanned one diagonal d = t2 - t1 at a time with NumPy.
+
+    Walking s = t1+1, t1+2, ... the first step where the actions differ or the
+    next labels differ decides the pair: it qualifies iff the actions still
+    agree there and the labels do not.
+    """
+    T = len(plan_arr)
+    found: List[np.ndarray] = []
+    for d in range(1, T):
+        L = T - d
+        same_action = plan_arr[:L] == plan_arr[d:]
+        # diff[s]: labels observed after step s of both walks differ
+        diff = obs_arr[1 : L + 1] != obs_arr[d + 1 : T + 1]
+        event = diff | ~same_action
+        # next_event[s]: first event index >= s (L if none)
+        next_event = np.where(event, np.arange(L), L)
+        next_event = np.minimum.accumulate(next_event[::-1])[::-1]
+        decided = np.append(next_event[1:], L)
+        hit = decided < L
+        hit[hit] = same_action[decided[hit]]
+        t1 = np.flatnonzero(hit & ~diff)
+        if len(t1):
+            found.append(np.stack([t1 + 1, t1 + 1 + d], axis=-1))
+    if not found:
+        return np.empty((0, 2), dtype=np.intp)
+    pairs = np.concatenate(found).astype(np.intp)
+    return pairs[np.lexsort((pairs[:, 1], pairs[:, 0]))]
+
+
+def _pruning_hits_loop(plan_arr: np.ndarray, obs_arr: np.ndarray) -> np.ndarray:
+    """hit[t1, t2] for the same walk as _pruning_pairs_numpy (numba kernel, parallel over t1)."""
+    T = plan_arr.shape[0]
+    hit = np.zeros((T, T), dtype=np.bool_)
+    for t1 in prange(T):
+        for t2 in range(t1 + 1, T):
+            if obs_arr[t1 + 1] != obs_arr[t2 + 1]:
+                continue
+            d = t2 - t1
+            for s in range(t1 + 1, T - d):
+                if plan_arr[s] != plan_arr[s + d]:
+                    break
+                if obs_arr[s + 1] != obs_arr[s + d + 1]:
+                    hit[t1, t2] = True
+                    break
+    return hit
+
+
+if _NUMBA_AVAILABLE:
+    _pruning_hits = njit(parallel=True, cache=True)(_pruning_hits_loop)
+
+    def pruning_pairs(plan_arr: np.ndarray, obs_arr: np.ndarray) -> np.ndarray:
+        # argwhere yields the hits already in (t1, t2) order
+        return (np.argwhere(_pruning_hits(plan_arr, obs_arr)) + 1).astype(np.intp)
+else:
+    pruning_pairs = _pruning_pairs_numpy
+
+
+def _trace_mismatches_loop(next_room, labels, plan, obs, D: int) -> int:
+    """Label mismatches along one trace from STARTING_ROOM_ID, or -1 if it leaves the map.
+
+    next_room[r*D + a] is the room behind door a of room r (-1 if unmatched)
+    and labels must cover every room. Runs on arrays (numba kernel) or plain lists.
+    """
+    cur = STARTING_ROOM_ID
+    bad = 0
+    if labels[cur] != obs[0]:
+        bad += 1
+    for t in range(len(plan)):
+        a = plan[t]
+        if a < 0 or a >= D:
+            return -1
+        cur = next_room[cur * D + a]
+        if cur < 0:
+            return -1
+        if labels[cur] != obs[t + 1]:
+            bad += 1
+    return bad
+
+
+if _NUMBA_AVAILABLE:
+    _trace_mismatches = njit(cache=True)(_trace_mismatches_loop)
+
+    def trace_mismatches(next_room: np.ndarray, labels: np.ndarray, plan: List[int], obs: List[int], D: int = 6) -> int:
+        return int(_trace_mismatches(next_room, labels, np.asarray(plan, dtype=np.int32), np.asarray(obs, dtype=np.int32), D))
+else:
+    def trace_mismatches(next_room: np.ndarray, labels: np.ndarray, plan: List[int], obs: List[int], D: int = 6) -> int:
+        # plain lists index much faster than NumPy scalars in the interpreter
+        return _trace_mismatches_loop(next_room.tolist(), labels.tolist(), plan, obs, D)
+
+
+def next_room_table(match: List[int], D: int = 6) -> np.ndarray:
+    """Room behind each port p = r*D + a, -1 where the port is unmatched."""
+    return np.asarray(match, dtype=np.int32) // D
+
+
+def find_pruning_pairs(plan: List[int], obs: List[int]) -> np.ndarray:
+    """Time index pairs (a, b) of one trace whose rooms must differ, as an (n, 2) array.
+
+    Knowledge-based pruning: if the future identical action prefixes diverge in labels,
+    then positions immediately after t1 and t2 cannot be the same room.
+    """
+    return pruning_pairs(np.asarray(plan, dtype=np.int8), np.asarray(obs, dtype=np.int8))
+
+
+def trace_clause_blocks(
+    plan: List[int],
+    obs: List[int],
+    X_arr: np.ndarray,
+    lab_by_obs: np.ndarray,
+    M_grid: np.ndarray,
+    pairs: np.ndarray,
+) -> Iterator[np.ndarray]:
+    """Label-consistency, transition and pruning clauses of one trace as literal arrays."""
+    T = len(plan)
+
+    # label consistency: x[t,k] -> (Label[k] == obs[t])
+    lab = lab_by_obs[np.asarray(obs, dtype=np.intp)]
+    yield np.stack([-X_arr, lab], axis=-1).reshape(-1, 2)
+
+    # transitions: for each t,k and each next room g,
+    # x[t,k] ∧ (OR_{q in g} U_{p,q}) -> x[t+1,g]
+    # we introduce M_{p,g} to collapse the OR over q
+    doors = np.asarray(plan, dtype=np.intp)
+    N = X_arr.shape[1]
+    step = max(1, TRANSITION_CHUNK // (2 * N * N))
+    for t0 in range(0, T, step):
+        t1 = min(T, t0 + step)
+        yield transition_block(doors[t0:t1], X_arr[t0 : t1 + 1], M_grid)
+
+    # pruning: rooms at the two time indices of each pair differ
+    if len(pairs):
+        a, b = pairs.T
+        yield np.stack([-X_arr[a], -X_arr[b]], axis=-1).reshape(-1, 2)
+
+
+def dimacs_lines(clauses: np.ndarray) -> str:
+    """DIMACS text for a (num_clauses, width) literal array, one format string per chunk."""
+    rows, width = clauses.shape
+    row_fmt = "%d " * width + "0\n"
+    return "".join(
+        (row_fmt * len(chunk)) % tuple(chunk.ravel().tolist())
+        for chunk in (clauses[start : start + ROW_CHUNK] for start in range(0, rows, ROW_CHUNK))
+    )
+
+
+def write_dimacs(fp: IO[str], cnf: SatCNF) -> None:
+    """Write ``cnf`` as DIMACS, formatting ROW_CHUNK clauses per format string.
+
+    Replaces cnf.to_fp, which formats literal by literal. Each chunk is flattened
+    with a 0 after every clause; literals are never 0, so every " 0 " in the
+    formatted text ends a clause and becomes " 0\n". Clauses must be non-empty.
+    """
+    clauses = cnf.clauses
+    fp.write(f"p cnf {cnf.nv} {len(clauses)}\n")
+    for start in range(0, len(clauses), ROW_CHUNK):
+        flat = list(itertools.chain.from_iterable((*c, 0) for c in clauses[start : start + ROW_CHUNK]))
+        text = (" " + "%d " * len(flat) % tuple(flat)).replace(" 0 ", " 0\n")
+        fp.write(text[1:])
+
+
+def _trace_dimacs(job: Tuple[Any, ...]) -> Tuple[str, int, int]:
+    """Pool worker: (DIMACS text, clause count, pruning clause count) for one trace."""
+    plan, obs, X_arr, lab_by_obs, M_grid = job
+    pairs = find_pruning_pairs(plan, obs)
+    blocks = list(trace_clause_blocks(plan, obs, X_arr, lab_by_obs, M_grid, pairs))
+    text = "".join(dimacs_lines(block) for block in blocks)
+    return text, sum(len(block) for block in blocks), len(pairs) * X_arr.shape[1]
+
+
+class DimacsWriter:
+    """Clause sink that streams DIMACS text to a seekable file as clauses arrive.
+
+    Supports the ``append``/``extend`` subset of ``pysat.formula.CNF`` used by
+    build_cnf, so the formula never exists as a list of Python lists. A fixed
+    size block is reserved at the top of the file and overwritten with the
+    ``p cnf`` header by ``finish()`` once the counts are known.
+    """
+
+    HEADER_SIZE = 64
+
+    def __init__(self, fp: IO[str]) -> None:
+        self.fp = fp
+        self.nv = 0
+        self.nclauses = 0
+        self._start = fp.tell()
+        fp.write(self._header_block(""))
+
+    @classmethod
+    def _header_block(cls, header: str) -> str:
+        """``header`` preceded by a comment line padding it to HEADER_SIZE characters."""
+        pad = cls.HEADER_SIZE - len(header) - 2
+        if pad < 0:
+            raise ValueError("DIMACS header does not fit in the reserved block")
+        return "c" + " " * pad + "\n" + header
+
+    def append(self, clause: List[int]) -> None:
+        self.fp.write(" ".join(map(str, clause)) + " 0\n")
+        self.nclauses += 1
+
+    def extend(self, clauses: Iterable[List[int]]) -> None:
+        lines = [" ".join(map(str, c)) + " 0\n" for c in clauses]
+        self.fp.write("".join(lines))
+        self.nclauses += len(lines)
+
+    def extend_array(self, clauses: np.ndarray) -> None:
+        self.write_lines(dimacs_lines(clauses), len(clauses))
+
+    def write_lines(self, text: str, count: int) -> None:
+        """Write ``count`` clauses that are already formatted as DIMACS lines."""
+        self.fp.write(text)
+        self.nclauses += count
+
+    def finish(self) -> None:
+        """Overwrite the reserved block with the final header (padding kept as a comment)."""
+        block = self._header_block(f"p cnf {self.nv} {self.nclauses}\n")
+        end = self.fp.tell()
+        self.fp.seek(self._start)
+        self.fp.write(block)
+        self.fp.seek(end)
+        self.fp.flush()
+
+
+class GzipDimacsWriter(DimacsWriter):
+    """DimacsWriter producing a gzip file, which kissat reads directly by its .gz suffix.
+
+    The file holds two gzip members: the header block, stored uncompressed so its
+    size never changes and finish() can rewrite it in place, followed by the
+    clauses compressed at ``compresslevel``.
+    """
+
+    def __init__(self, raw: BinaryIO, compresslevel: int = 1) -> None:
+        self.raw = raw
+        self.nv = 0
+        self.nclauses = 0
+        self._start = raw.tell()
+        self._write_member(self._header_block(""))
+        self._body = gzip.GzipFile(filename="", mode="wb", fileobj=raw, compresslevel=compresslevel, mtime=0)
+        self.fp = io.TextIOWrapper(self._body, encoding="ascii")
+
+    def _write_member(self, text: str) -> None:
+        with gzip.GzipFile(filename="", mode="wb", fileobj=self.raw, compresslevel=0, mtime=0) as member:
+            member.write(text.encode("ascii"))
+
+    def finish(self) -> None:
+        # closing the wrapper ends the body member; the raw file stays open
+        self.fp.close()
+        end = self.raw.tell()
+        self.raw.seek(self._start)
+        self._write_member(self._header_block(f"p cnf {self.nv} {self.nclauses}\n"))
+        self.raw.seek(end)
+        self.raw.flush()
+
+
+class ClauseList:
+    """In-memory clause sink whose list is allocated at its estimated final size.
+
+    Clauses are written into the reserved slots (growing past them if the
+    estimate was short), which avoids the repeated regrow copies of appending
+    millions of clauses; ``to_cnf()`` trims the list and hands it to a pysat CNF.
+    """
+
+    def __init__(self, capacity: int) -> None:
+        self.clauses: List[Optional[List[int]]] = [None] * capacity
+        self.nv = 0
+        self.nclauses = 0
+
+    def append(self, clause: List[int]) -> None:
+        if self.nclauses < len(self.clauses):
+            self.clauses[self.nclauses] = clause
+        else:
+            self.clauses.append(clause)
+        self.nclauses += 1
+
+    def extend(self, clauses: Iterable[List[int]]) -> None:
+        if not isinstance(clauses, list):
+            clauses = list(clauses)
+        end = self.nclauses + len(clauses)
+        self.clauses[self.nclauses : end] = clauses
+        self.nclauses = end
+
+    def to_cnf(self) -> SatCNF:
+        del self.clauses[self.nclauses :]
+        cnf = SatCNF()
+        cnf.clauses = self.clauses
+        cnf.nv = self.nv
+        return cnf
+
+
+def estimate_num_clauses(plan_lengths: List[int], N: int, D: int) -> int:
+    """Rough clause count of build_cnf, not counting pruning clauses."""
+    P = D * N
+    eo = lambda n: max(1, 3 * n - 3)
+    total = N * eo(4) + 4 + 8 * N * (N // 4) + 3 * N
+    total += P * eo(P) + P * N * (D + 1)
+    for T in plan_lengths:
+        total += (T + 1) * (eo(N) + N) + 1 + 2 * T * N * N
+    return total
+
+
+def extend_clause_array(cnf: Union[ClauseList, DimacsWriter], clauses: np.ndarray) -> None:
+    """Append every row of an integer literal array to ``cnf`` as a clause."""
+    if isinstance(cnf, DimacsWriter):
+        cnf.extend_array(clauses)
+    else:
+        cnf.extend(clauses.tolist())
 
 
 def build_cnf(
@@ -36,7 +545,21 @@ def build_cnf(
     D: int = 6,
     progress: bool = False,
     prefix_steps: Optional[int] = None,
-) -> Tuple[SatCNF, Dict[str, any]]:
+    fp: Optional[Union[IO[str], DimacsWriter]] = None,
+    workers: int = 1,
+    amo_encoding: str = "product",
+    amk_encoding: str = "seqcounter",
+) -> Tuple[Union[SatCNF, DimacsWriter], Dict[str, any]]:
+    """Encode the map reconstruction problem as CNF.
+
+    When ``fp`` is given, clauses are streamed to it as DIMACS and the returned
+    formula is the finished DimacsWriter; otherwise an in-memory CNF is built.
+    ``fp`` may also be a fresh DimacsWriter (e.g. a GzipDimacsWriter) to stream into.
+    With ``workers > 1`` and ``fp``, the per-trace clauses of multiple plans are
+    generated and formatted in a process pool. ``amo_encoding`` selects the
+    at-most-one half of every exactly-one constraint (see AMO_ENCODINGS) and
+    ``amk_encoding`` the balanced-label at-least constraints (see AMK_ENCODINGS).
+    """
     # Validate and optionally truncate to prefix_steps
     used_plans: List[List[int]] = []
     used_results: List[List[int]] = []
@@ -55,166 +578,154 @@ def build_cnf(
         used_results.append(r[: T + 1])
 
     P = D * N
-    cnf = SatCNF()
+    if isinstance(fp, DimacsWriter):
+        cnf = fp
+    elif fp is not None:
+        cnf = DimacsWriter(fp)
+    else:
+        cnf = ClauseList(estimate_num_clauses([len(plan) for plan in used_plans], N, D))
     pool = IDPool()
-    port_matching_keys: Set[Tuple[int, int]] = set()
-    m_keys: Set[Tuple[int, int]] = set()
-    x_keys: Set[Tuple[int, int, int]] = set()
+    num_x_vars = 0
 
     # Label bits per room (2-bit encoding)
     def label_assign_var(rid: int, bits: Literal[0, 1, 2, 3]) -> int:
         return pool.id(("L", rid, bits))
 
-    # Helper for U and M and X
-    def port_matching_var(pid0: int, pid1: int) -> int:
-        port_matching_keys.add((pid0, pid1))
-        return pool.id(("P", pid0, pid1))
-
-    def move_possibility_var(pid: int, rid: int) -> int:
-        m_keys.add((pid, rid))
-        return pool.id(("M", pid, rid))
-
-    def trace_location_assign_var(tid: int, timestamp: int, rid: int) -> int:
-        x_keys.add((tid, timestamp, rid))
-        return pool.id(("T", tid, timestamp, rid))
-    
+    # X ids are taken unkeyed from the pool and kept in X_arrs: each one is used once,
+    # and a keyed pool.id(("T", tid, t, rid)) costs a tuple build and hash per call
+    # (U and M ids are computed arithmetically, see below)
     # ---------------- (1) Label constraints ----------------
 
     # For all room, exactly one label in {0, 1, 2, 3}
     for rid in range(N):
         lits = [label_assign_var(rid, bits) for bits in range(4)]
-        enc = CardEnc.equals(lits=lits, bound=1, vpool=pool, encoding=EncType.seqcounter)
-        cnf.extend(enc.clauses)
+        cnf.extend(exactly_one(lits, pool, amo_encoding))
 
     # For the starting room, fix the label to each plan's first observation
-    for obs in used_results:
-        cnf.append([label_assign_var(STARTING_ROOM_ID, int(obs[0]))])
+    for first_obs in sorted({int(obs[0]) for obs in used_results}):
+        cnf.append([label_assign_var(STARTING_ROOM_ID, first_obs)])
 
     # Balanced distribution: for each label bits in {0,1,2,3}, enforce at least floor(N/4)
     base = N // 4
     if base > 0:
         for bits in range(4):
             lits = [label_assign_var(rid, bits) for rid in range(N)]
-            enc = CardEnc.atleast(lits=lits, bound=base, vpool=pool, encoding=EncType.seqcounter)
-            cnf.extend(enc.clauses)
+            cnf.extend(at_least(lits, base, pool, amk_encoding))
+
+    # Symmetry breaking: every room except the starting one may be renumbered freely,
+    # so require labels to be non-decreasing over rooms 1..N-1:
+    # L(k, c) -> OR_{c' >= c} L(k+1, c')
+    for rid in range(STARTING_ROOM_ID + 1, N - 1):
+        for bits in range(1, 4):
+            cnf.append(
+                [-label_assign_var(rid, bits)]
+                + [label_assign_var(rid + 1, nbits) for nbits in range(bits, 4)]
+            )
 
 
     # print the number of variables and clauses created for label constraints
     if progress:
-        print(f"[kissat] Label constraints: vars={pool.top}, clauses={len(cnf.clauses)}")
+        print(f"[kissat] Label constraints: vars={pool.top}, clauses={cnf.nclauses}")
     num_label_vars = pool.top
-    num_label_clauses = len(cnf.clauses)
+    num_label_clauses = cnf.nclauses
 
 
     # ---------------- (2) Port matching constraints ----------------
     # Port matching constraints: for each port p, exactly one partner q
-    port_matching_var_dict = dict()
-    for to_pid in range(P):
-        for from_pid in range(to_pid + 1):
-            var = port_matching_var(from_pid, to_pid)
-            port_matching_var_dict[(from_pid, to_pid)] = var
-            port_matching_var_dict[(to_pid, from_pid)] = var
+    # U_{i,j} (i <= j) get consecutive ids in (j, i) order: id = port_var_base + j*(j+1)/2 + i.
+    # The block is reserved in the pool and U[p, q] holds the (symmetric) id for any pair.
+    port_var_base = pool.top + 1
+    pool.occupy(port_var_base, port_var_base + P * (P + 1) // 2 - 1)
+    pids = np.arange(P, dtype=np.int64)
+    hi = np.maximum(pids[:, None], pids[None, :])
+    lo = np.minimum(pids[:, None], pids[None, :])
+    U = (port_var_base + hi * (hi + 1) // 2 + lo).astype(np.int32)
 
     for from_pid in range(P):
-        vars_list = [port_matching_var_dict[(from_pid, q)] for q in range(P)]
-        enc = CardEnc.equals(lits=vars_list, bound=1, vpool=pool, encoding=EncType.seqcounter)
-        cnf.extend(enc.clauses)
+        cnf.extend(exactly_one(U[from_pid].tolist(), pool, amo_encoding))
 
     # print the number of variables and clauses created for port matching constraints
     if progress:
-        print(f"[kissat] Port matching constraints: vars={pool.top - num_label_vars}, clauses={len(cnf.clauses) - num_label_clauses}")
+        print(f"[kissat] Port matching constraints: vars={pool.top - num_label_vars}, clauses={cnf.nclauses - num_label_clauses}")
 
 
     # ---------------- (3) Trace constraints ----------------
 
     # Prepare variable representing OR_{q in g} U_{p,q} (M_{p,g}) in advance
-    for from_pid in range(P):
-        from_rid, _ = divmod(from_pid, D)
-        for to_rid in range(N):
-            m = move_possibility_var(from_pid, to_rid)
-            u_literals: List[int] = []
-            for d in range(D):
-                to_pid = D * to_rid + d
-                u_literals.append(port_matching_var_dict[(from_pid, to_pid)])
-                # # (¬U -> M): (¬U ∨ M)
-                cnf.append([-u_literals[-1], m])
-            # Link M_{p,g} <-> OR_{o} U_{p, D*g+o}
-            # (¬M ∨ U1 ∨ ... ∨ U6)
-            cnf.append([-m] + u_literals)
+    # M_{p,g} get consecutive ids in (p, g) order: id = move_var_base + N*p + g,
+    # so M_grid[from_rid, door, to_rid] is the id for p = D*from_rid + door.
+    move_var_base = pool.top + 1
+    pool.occupy(move_var_base, move_var_base + P * N - 1)
+    M = np.arange(move_var_base, move_var_base + P * N, dtype=np.int32).reshape(P, N)
+    M_grid = M.reshape(N, D, N)
+    # u_by_room[p, g, d] = U_{p, D*g+d}
+    u_by_room = U.reshape(P, N, D)
+    # (¬U -> M): (¬U ∨ M)
+    extend_clause_array(
+        cnf, np.stack([-u_by_room, np.broadcast_to(M[:, :, None], u_by_room.shape)], axis=-1).reshape(-1, 2)
+    )
+    # Link M_{p,g} <-> OR_{o} U_{p, D*g+o}
+    # (¬M ∨ U1 ∨ ... ∨ U6)
+    extend_clause_array(cnf, np.concatenate([-M[:, :, None], u_by_room], axis=-1).reshape(-1, D + 1))
+
 
+    # Label literal per (observed label, room), shared by every trace/time step
+    lab_by_obs = np.array(
+        [[label_assign_var(rid, bits) for rid in range(N)] for bits in range(4)], dtype=np.int32
+    )
 
     # Location variables per plan/time/room
-    X: List[List[List[int]]] = []
+    X_arrs: List[np.ndarray] = []
     for trace_id, (plan, obs) in enumerate(zip(used_plans, used_results)):
 
         T = len(plan)
-        x_plan: List[List[int]] = []
         for t in range(T + 1):
-            x_t = [trace_location_assign_var(trace_id, t, rid) for rid in range(N)]
-            # exactly one via PySAT encoder
-            enc = CardEnc.equals(lits=x_t, bound=1, vpool=pool, encoding=EncType.seqcounter)
-            cnf.extend(enc.clauses)
-            x_plan.append(x_t)
-        X.append(x_plan)
+            assert obs[t] in (0, 1, 2, 3), f"Invalid observation {obs[t]} at plan {trace_id}, time {t}"
+        for t in range(T):
+            assert 0 <= plan[t] < D, f"Invalid action {plan[t]} at plan {trace_id}, time {t}"
 
-        # label consistency: x[t,k] -> (Label[k] == obs[t])
+        x_plan: List[List[int]] = []
         for t in range(T + 1):
-            for rid in range(N):
-                assert obs[t] in (0, 1, 2, 3), f"Invalid observation {obs[t]} at plan {trace_id}, time {t}"
-                cnf.append([-x_plan[t][rid], label_assign_var(rid, obs[t])])
-
+            x_t = [pool.id() for _ in range(N)]
+            # exactly one via the cached template for `amo_encoding`
+            cnf.extend(exactly_one(x_t, pool, amo_encoding))
+            x_plan.append(x_t)
+        X_arrs.append(np.asarray(x_plan, dtype=np.int32))
+        num_x_vars += (T + 1) * N
 
         # starting room
         cnf.append([x_plan[0][STARTING_ROOM_ID]])
 
-        # transitions: for each t,k and each next room g,
-        # x[t,k] ∧ (OR_{q in g} U_{p,q}) -> x[t+1,g]
-        # we introduce M_{p,g} to collapse the OR over q
-        for t in range(T):
-            door = plan[t]
-            assert 0 <= door < D, f"Invalid action {door} at plan {trace_id}, time {t}"
-
-            for from_rid in range(N):
-                from_pid = D * from_rid + door
-                for to_rid in range(N):
-                    m = move_possibility_var(from_pid, to_rid)
-                    cnf.append([-X[trace_id][t][from_rid], -m, X[trace_id][t + 1][to_rid]])
-                    cnf.append([-X[trace_id][t][from_rid], -X[trace_id][t + 1][to_rid], m])
-                    
-        # Knowledge-based pruning: if the future identical action prefixes diverge in labels,
-        # then positions immediately after t1 and t2 cannot be the same room.
-        added = 0
-        T = len(plan)
-        for t1 in range(T):
-            for t2 in range(t1 + 1, T):
-                if obs[t1 + 1] != obs[t2 + 1]:
-                    continue
-                # find longest k >= 1 such that plan[t1+1..t1+k] == plan[t2+1..t2+k]
-                k = 0
-                j = 1
-                while (t1 + j) < T and (t2 + j) < T and plan[t1 + j] == plan[t2 + j]:
-                    k += 1
-                    j += 1
-                if k == 0:
-                    continue
-                # if any idx in 1..k yields differing observed labels, enforce inequality at t1+1 vs t2+1
-                differing = False
-                for i in range(1, k + 1):
-                    if int(obs[t1 + 1 + i]) != int(obs[t2 + 1 + i]):
-                        differing = True
-                        break
-                if not differing:
-                    continue
-                for rid in range(N):
-                    cnf.append([-X[trace_id][t1 + 1][rid], -X[trace_id][t2 + 1][rid]])
-                    added += 1
-        if progress and added:
-            print(f"[kissat] added {added} pruning binary clauses for trace {trace_id}")
+    # The remaining per-trace clauses only read the id tables above, so traces are
+    # independent of each other from here on.
+    jobs = [
+        (plan, obs, X_arr, lab_by_obs, M_grid)
+        for plan, obs, X_arr in zip(used_plans, used_results, X_arrs)
+    ]
+    if workers > 1 and len(jobs) > 1 and isinstance(cnf, DimacsWriter):
+        with multiprocessing.Pool(processes=min(workers, len(jobs))) as procs:
+            for trace_id, (text, count, added) in enumerate(procs.imap(_trace_dimacs, jobs)):
+                cnf.write_lines(text, count)
+                if progress and added:
+                    print(f"[kissat] added {added} pruning binary clauses for trace {trace_id}")
+    else:
+        for trace_id, job in enumerate(jobs):
+            pairs = find_pruning_pairs(job[0], job[1])
+            for block in trace_clause_blocks(*job, pairs):
+                extend_clause_array(cnf, block)
+            added = len(pairs) * N
+            if progress and added:
+                print(f"[kissat] added {added} pruning binary clauses for trace {trace_id}")
 
 
 
     # Ensure nv is at least the top variable id
-    cnf.nv = max(getattr(cnf, 'nv', 0) or 0, pool.top)
+    cnf.nv = max(getattr(cnf, 'nv', 0) or 0, pool.top, move_var_base + P * N - 1)
+    nclauses = cnf.nclauses
+    if isinstance(cnf, DimacsWriter):
+        cnf.finish()
+    else:
+        cnf = cnf.to_cnf()
     meta = {
         "N": N,
         "D": D,
@@ -223,104 +734,198 @@ def build_cnf(
         "results": used_results,
         "starting_room": 0,
         "pool": pool,
-        "port_matching_keys": port_matching_keys,
+        "port_var_base": port_var_base,
+        # label_vars[k, bits] = id of L(k, bits)
+        "label_vars": np.ascontiguousarray(lab_by_obs.T),
     }
     if progress:
-        print(f"[kissat] CNF built: vars~{pool.top}, clauses={len(cnf.clauses)}, U={len(port_matching_keys)}, M={len(m_keys)}, X={len(x_keys)}")
+        print(f"[kissat] CNF built: vars~{pool.top}, clauses={nclauses}, U={P * (P + 1) // 2}, M={P * N}, X={num_x_vars}")
     return cnf, meta
 
 
+def _run_with_stdin(cmd: List[str], cnf: SatCNF) -> Tuple[str, str]:
+    """Run kissat without an input path, feeding the DIMACS through its stdin."""
+    proc = subprocess.Popen(
+        cmd, stdin=subprocess.PIPE, stdout=subprocess.PIPE, stderr=subprocess.PIPE, text=True
+    )
+    # stdin is owned by the writer thread; communicate() only drains stdout/stderr
+    stdin, proc.stdin = proc.stdin, None
+
+    def feed() -> None:
+        try:
+            write_dimacs(stdin, cnf)
+            stdin.close()
+        except BrokenPipeError:
+            # kissat exited early (e.g. on a parse error); its stderr says why
+            pass
+
+    writer = threading.Thread(target=feed, daemon=True)
+    writer.start()
+    stdout, stderr = proc.communicate()
+    writer.join()
+    return stdout, stderr
+
+
 def solve_with_kissat(
-    cnf: SatCNF,
+    cnf: Union[SatCNF, str],
     time_limit_s: Optional[float] = None,
     progress: bool = False,
     seed: Optional[int] = None,
-) -> Tuple[str, Dict[int, bool]]:
-    """Solve CNF with external 'kissat' binary. Returns (status, assignment). status in {SAT, UNSAT, UNKNOWN}"""
-
-    with tempfile.TemporaryDirectory() as td:
-        cnf_path = os.path.join(td, "problem.cnf")
-        # write DIMACS using PySAT utility
-        cnf.to_file(cnf_path)
-        cmd = ["kissat", "-q"]
-        # Try to pass time limit if supported
-        if time_limit_s and time_limit_s > 0:
-            # Many builds support '--time=SECONDS'
-            cmd.append(f"--time={int(time_limit_s)}")
-        if seed is not None:
-            cmd.append(f"--seed={int(seed)}")
-        cmd.append(cnf_path)
-        if progress:
-            print("[kissat] Running:", " ".join(cmd))
-        try:
+) -> Tuple[str, bytearray]:
+    """Solve CNF with external 'kissat' binary. Returns (status, assignment). status in {SAT, UNSAT, UNKNOWN}
+
+    The assignment is a bytearray indexed by variable id: 1 if true, 0 if false.
+
+    ``cnf`` is either an in-memory formula, which is piped to kissat's stdin, or
+    the path of a DIMACS file that is already on disk (e.g. written by build_cnf
+    with ``fp``).
+    """
+
+    cmd = ["kissat", "-q"]
+    # Try to pass time limit if supported
+    if time_limit_s and time_limit_s > 0:
+        # Many builds support '--time=SECONDS'
+        cmd.append(f"--time={int(time_limit_s)}")
+    if seed is not None:
+        cmd.append(f"--seed={int(seed)}")
+    if isinstance(cnf, str):
+        cmd.append(cnf)
+    if progress:
+        print("[kissat] Running:", " ".join(cmd))
+    try:
+        if isinstance(cnf, str):
             out = subprocess.run(cmd, capture_output=True, text=True, check=False)
-        except Exception as e:
-            raise RuntimeError(f"Failed to run kissat: {e}")
+            stdout, stderr = out.stdout, out.stderr
+        else:
+            stdout, stderr = _run_with_stdin(cmd, cnf)
+    except Exception as e:
+        raise RuntimeError(f"Failed to run kissat: {e}")
+
+    if progress and stderr.strip():
+        print("[kissat] stderr:\n" + stderr)
 
-        stdout = out.stdout
-        stderr = out.stderr
-        if progress and stderr.strip():
-            print("[kissat] stderr:\n" + stderr)
+    return parse_kissat_output(stdout)
 
+
+def parse_kissat_output(stdout: str) -> Tuple[str, bytearray]:
+    """(status, assignment) from kissat's stdout, as returned by solve_with_kissat."""
     status = "UNKNOWN"
     if "UNSATISFIABLE" in stdout:
         status = "UNSAT"
-        return status, {}
+        return status, bytearray()
     if "SATISFIABLE" in stdout:
         status = "SAT"
     # parse 'v ' model lines
-    model_lits: List[int] = []
-    for line in stdout.splitlines():
-        line = line.strip()
-        if line.startswith("v ") or line.startswith("V "):
-            parts = line[1:].split()
-            for tok in parts:
-                try:
-                    v = int(tok)
-                except ValueError:
-                    continue
-                if v == 0:
-                    continue
-                model_lits.append(v)
-    assign: Dict[int, bool] = {}
-    for lit in model_lits:
-        var = abs(lit)
-        val = lit > 0
-        assign[var] = val
+    body = " ".join(MODEL_LINE_RE.findall(stdout))
+    lits = np.fromiter(map(int, body.split()), dtype=np.int64)
+    assign = bytearray(int(np.abs(lits).max(initial=0)) + 1)
+    np.frombuffer(assign, dtype=np.uint8)[lits[lits > 0]] = 1
+    return status, assign
+
+
+def portfolio_commands(
+    cnf_path: str, size: int, time_limit_s: Optional[float] = None, seed: Optional[int] = None
+) -> List[List[str]]:
+    """Kissat command lines for a portfolio of ``size`` runs on the same DIMACS file.
+
+    Member i uses seed ``seed + i`` and cycles through PORTFOLIO_OPTIONS, so even
+    members sharing an option set search differently.
+    """
+    base_seed = 0 if seed is None else int(seed)
+    cmds = []
+    for i in range(size):
+        cmd = ["kissat", "-q", f"--seed={base_seed + i}"]
+        if time_limit_s and time_limit_s > 0:
+            cmd.append(f"--time={int(time_limit_s)}")
+        cmd += PORTFOLIO_OPTIONS[i % len(PORTFOLIO_OPTIONS)]
+        cmd.append(cnf_path)
+        cmds.append(cmd)
+    return cmds
+
+
+def solve_with_kissat_portfolio(
+    cnf_path: str,
+    size: int,
+    time_limit_s: Optional[float] = None,
+    progress: bool = False,
+    seed: Optional[int] = None,
+) -> Tuple[str, bytearray]:
+    """Run ``size`` differently configured kissat processes on one CNF file in parallel.
+
+    Returns the result of the first run that decides the instance (SAT or UNSAT)
+    and kills the rest; UNKNOWN if every run gives up. Same return value as
+    solve_with_kissat.
+    """
+    cmds = portfolio_commands(cnf_path, size, time_limit_s, seed)
+    finished: "queue.Queue[Tuple[int, str]]" = queue.Queue()
+    procs: List[subprocess.Popen] = []
+
+    def wait(i: int, proc: subprocess.Popen) -> None:
+        stdout, _ = proc.communicate()
+        finished.put((i, stdout))
+
+    try:
+        for i, cmd in enumerate(cmds):
+            if progress:
+                print(f"[kissat] Portfolio member {i}:", " ".join(cmd))
+            proc = subprocess.Popen(cmd, stdout=subprocess.PIPE, stderr=subprocess.DEVNULL, text=True)
+            procs.append(proc)
+            threading.Thread(target=wait, args=(i, proc), daemon=True).start()
+    except Exception as e:
+        for proc in procs:
+            proc.kill()
+        raise RuntimeError(f"Failed to run kissat: {e}")
+
+    status, assign = "UNKNOWN", bytearray()
+    try:
+        for _ in procs:
+            i, stdout = finished.get()
+            status, assign = parse_kissat_output(stdout)
+            if status != "UNKNOWN":
+                if progress:
+                    print(f"[kissat] Portfolio member {i} finished first: {status}")
+                break
+    finally:
+        for proc in procs:
+            if proc.poll() is None:
+                proc.kill()
     return status, assign
 
 
-def extract_solution(meta: Dict[str, any], assign: Dict[int, bool]) -> Dict[str, any]:
+def extract_solution(meta: Dict[str, any], assign: bytearray) -> Dict[str, any]:
     N = meta["N"]
     D = meta["D"]
+    P = meta["P"]
     starting_room = meta["starting_room"]
-    pool: IDPool = meta["pool"]
-    port_matching_keys: Set[Tuple[int, int]] = meta["port_matching_keys"]
+    port_var_base: int = meta["port_var_base"]
+    label_vars: np.ndarray = meta["label_vars"]
 
-    # decode labels
-    rooms: List[int] = []
-    for k in range(N):
-        val = None
-        for bits in range(4):
-            if assign.get(pool.id(("L", k, bits)), False):
-                val = bits
-                break
-        assert val is not None, f"Room {k} has no label assigned"
-        rooms.append(val)
+    # decode labels: first true L(k, bits) of each room
+    values = np.zeros(int(label_vars.max(initial=0)) + 1, dtype=np.uint8)
+    known = min(len(values), len(assign))
+    values[:known] = np.frombuffer(assign, dtype=np.uint8, count=known)
+    label_true = values[label_vars] == 1
+    missing = np.flatnonzero(~label_true.any(axis=1))
+    assert not len(missing), f"Room {missing[0]} has no label assigned"
+    rooms: List[int] = label_true.argmax(axis=1).tolist()
 
 
-    # decode connections
+    # decode connections: scan the contiguous U_{i,j} block for true bytes
     connections: List[Dict[str, Dict[str, int]]] = []
-    for (i, j) in port_matching_keys:
-        if i <= j and assign.get(pool.id(("P", i, j)), False):
-            ri, di = divmod(i, D)
-            rj, dj = divmod(j, D)
-            connections.append(
-                {
-                    "from": {"room": ri, "door": di},
-                    "to": {"room": rj, "door": dj},
-                }
-            )
+    ports = assign[port_var_base : port_var_base + P * (P + 1) // 2]
+    idx = ports.find(1)
+    while idx != -1:
+        j = (math.isqrt(8 * idx + 1) - 1) // 2
+        i = idx - j * (j + 1) // 2
+        ri, di = divmod(i, D)
+        rj, dj = divmod(j, D)
+        connections.append(
+            {
+                "from": {"room": ri, "door": di},
+                "to": {"room": rj, "door": dj},
+            }
+        )
+        idx = ports.find(1, idx + 1)
     connections.sort(key=lambda e: (e["from"]["room"], e["from"]["door"], e["to"]["room"], e["to"]["door"]))
     return {
         "status": 1 if connections else 0,
@@ -364,8 +969,15 @@ def verify_solution(plans: List[List[int]], results: List[List[int]], N: int, ou
     if len(labels) != N:
         errs.append(f"rooms label length mismatch: got {len(labels)} expected {N}")
 
-    # Simulate each plan
+    # Simulate each plan; traces the compiled walk finds consistent skip the
+    # step-by-step replay, which only runs to report what went wrong
+    fast = 0 < N == len(labels)
+    if fast:
+        next_room = next_room_table(match, D)
+        labels_arr = np.asarray(labels, dtype=np.int32)
     for idx, (plan, obs) in enumerate(zip(plans, results)):
+        if fast and len(obs) > len(plan) and trace_mismatches(next_room, labels_arr, plan, obs, D) == 0:
+            continue
         # start
         cur = 0
         if not (0 <= cur < N):
@@ -408,9 +1020,17 @@ def main() -> None:
     parser.add_argument("--output", "-o", type=str, help="Output JSON (stdout if omitted)")
     parser.add_argument("--time", type=float, default=600.0, help="Time limit in seconds")
     parser.add_argument("--seed", type=int, default=None, help="Random seed passed to Kissat (--seed)")
+    parser.add_argument("--portfolio", type=int, default=1, help="Run this many differently seeded/configured Kissat processes in parallel; first answer wins")
     parser.add_argument("--prefix-steps", type=int, default=None, help="Use only the first K steps of each plan when building CNF")
+    parser.add_argument("--workers", "-j", type=int, default=1, help="Worker processes for per-trace clause generation")
+    parser.add_argument("--amo-encoding", choices=AMO_ENCODINGS, default="product", help="At-most-one encoding inside exactly-one constraints")
+    parser.add_argument("--amk-encoding", choices=AMK_ENCODINGS, default="seqcounter", help="Encoding of the balanced-label at-least constraints")
+    parser.add_argument("--gzip", action="store_true", help="Hand the CNF to Kissat as gzip-compressed DIMACS (.cnf.gz)")
+    parser.add_argument("--stdin", action="store_true", help="Build the CNF in memory and pipe it to Kissat's stdin instead of a temp file")
     parser.add_argument("--progress", "-p", action="store_true", help="Print progress logs")
     args = parser.parse_args()
+    if args.stdin and (args.gzip or args.portfolio > 1):
+        parser.error("--stdin cannot be combined with --gzip or --portfolio, which need a CNF file")
 
     if args.input:
         with open(args.input, "r") as f:
@@ -426,15 +1046,57 @@ def main() -> None:
         print(f"[kissat] Building CNF… N={N}, plans={len(plans)}, time={args.time}s")
     if args.progress and args.prefix_steps is not None:
         print(f"[kissat] Using only the first {args.prefix_steps} steps of each plan")
-    cnf, meta = build_cnf(plans, results, N, progress=args.progress, prefix_steps=args.prefix_steps)
-    if args.progress:
-        print("[kissat] Solving…")
-    status, assign = solve_with_kissat(
-        cnf,
-        time_limit_s=args.time,
-        progress=args.progress,
-        seed=args.seed,
-    )
+    if args.stdin:
+        # no temp file: the in-memory formula is written straight into kissat's stdin
+        cnf, meta = build_cnf(
+            plans,
+            results,
+            N,
+            progress=args.progress,
+            prefix_steps=args.prefix_steps,
+            amo_encoding=args.amo_encoding,
+            amk_encoding=args.amk_encoding,
+        )
+        if args.progress:
+            print("[kissat] Solving…")
+        status, assign = solve_with_kissat(
+            cnf,
+            time_limit_s=args.time,
+            progress=args.progress,
+            seed=args.seed,
+        )
+    else:
+        with tempfile.TemporaryDirectory() as td:
+            cnf_path = os.path.join(td, "problem.cnf.gz" if args.gzip else "problem.cnf")
+            with open(cnf_path, "wb" if args.gzip else "w") as fp:
+                _, meta = build_cnf(
+                    plans,
+                    results,
+                    N,
+                    progress=args.progress,
+                    prefix_steps=args.prefix_steps,
+                    fp=GzipDimacsWriter(fp) if args.gzip else fp,
+                    workers=args.workers,
+                    amo_encoding=args.amo_encoding,
+                    amk_encoding=args.amk_encoding,
+                )
+            if args.progress:
+                print("[kissat] Solving…")
+            if args.portfolio > 1:
+                status, assign = solve_with_kissat_portfolio(
+                    cnf_path,
+                    args.portfolio,
+                    time_limit_s=args.time,
+                    progress=args.progress,
+                    seed=args.seed,
+                )
+            else:
+                status, assign = solve_with_kissat(
+                    cnf_path,
+                    time_limit_s=args.time,
+                    progress=args.progress,
+                    seed=args.seed,
+                )
     if args.progress:
         print(f"[kissat] Solve status: {status}")
 
@@ -22,11 +22,13 @@ Output (printed to stdout or written via --output):
 
 Notes:
 - Accepts plans using digits 0..5 or 1..6 (auto-normalized to 0..5).
-- SMT encoding uses a Port datatype and two functions:
-    delta : Port -> Port  (involution on ports)
-    label : Int  -> (_ BitVec 2)
+- SMT encoding is ground over bit-vectors: rooms are (_ BitVec w) with
+  w = bits(N-1), and port (q, c) is the flat id concat(q, c) of w+3 bits.
+    delta : (_ BitVec w+3) -> (_ BitVec w+3)  (involution on ports)
+    label : (_ BitVec w)   -> (_ BitVec 2)
 - Traces include the starting-room label and then one label per move:
     for j=0..L, label(x[i][j]) == results[i][j]  (L = len(plan))
+- --bitblast swaps the SMT solver for simplify/ackermannize_bv/bit-blast/sat.
 - Requires: `pip install z3-solver`
 """
 from __future__ import annotations
@@ -37,17 +39,21 @@ from typing import List, Tuple, Dict, Any, Optional
 
 from z3 import (
     Solver,
-    IntSort,
-    IntVal,
     And,
     Or,
     Not,
     BoolVal,
+    BitVec,
     BitVecSort,
     BitVecVal,
+    Concat,
+    Extract,
     Function,
     ForAll,
-    Datatype,
+    ULE,
+    ULT,
+    Then,
+    With,
     simplify,
     sat,
     set_option,
@@ -56,12 +62,39 @@ from z3 import (
 # ----------------------------- helpers -----------------------------
 
 
+def room_bits(N: int) -> int:
+    """Width of the room bit-vectors for N rooms."""
+    return max(1, (N - 1).bit_length())
+
+
 def inQ(q, N):
-    return And(IntVal(0) <= q, q < IntVal(N))
+    # every w-bit value is a room when N == 2**w
+    if N >= 1 << q.size():
+        return BoolVal(True)
+    return ULT(q, BitVecVal(N, q.size()))
 
 
 def inDoor(d):
-    return And(IntVal(0) <= d, d <= IntVal(5))
+    return ULE(d, BitVecVal(5, d.size()))
+
+
+def make_solver(bitblast: bool = False):
+    """Default SMT solver, or a pure bit-blast + CDCL pipeline.
+
+    bit-blast cannot see through the uninterpreted delta/label, so the
+    bitblast pipeline Ackermannizes them first. That costs one congruence
+    lemma per pair of applications (quadratic in the trace length), so it
+    is opt-in: the default solver is faster on the example problems.
+    """
+    if not bitblast:
+        return Solver()
+    return Then(
+        "simplify",
+        With("ackermannize_bv", div0_ackermann_limit=1 << 30),
+        "simplify",
+        "bit-blast",
+        "sat",
+    ).solver()
 
 
 def normalize_plan(p: str) -> List[int]:
@@ -97,101 +130,130 @@ def parse_input(
 # ----------------------------- core solver -----------------------------
 
 
+class MapEncoding:
+    """Ground bit-vector encoding of an N-room map on one solver.
+
+    Rooms are w-bit vectors with w = bits(N - 1). solve() checks the constraints
+    and decodes the model.
+    """
+
+    def __init__(
+        self,
+        N: int,
+        plans: List[List[int]],
+        results: List[List[int]],
+        starting_room: int = 0,
+        bitblast: bool = False,
+    ) -> None:
+        self.N = N
+        self.starting_room = starting_room
+        w = self.w = room_bits(N)
+        # port (q, c) is the bit-vector concat(q, c), so no datatype
+        self.delta = Function("delta", BitVecSort(w + 3), BitVecSort(w + 3))
+        self.label = Function("label", BitVecSort(w), BitVecSort(2))
+
+        s = self.s = make_solver(bitblast)
+        delta, label = self.delta, self.label
+
+        # Involution and guard constraints: for all q in [0..N-1], c in [0..5]
+        for q in range(N):
+            for c in range(6):
+                p = self.port(q, c)
+                p2 = delta(p)
+                # Guard codomain
+                s.add(inQ(self.room_of(p2), N))
+                s.add(inDoor(self.door_of(p2)))
+                # Involution: delta(delta(p)) == p
+                s.add(delta(p2) == p)
+
+        # Trace constraints
+        # door / label constants are shared by every step instead of rebuilt
+        doors = [self.door(c) for c in range(6)]
+        colors = [BitVecVal(o, 2) for o in range(4)]
+        x0 = self.room(starting_room)
+        for i, (plan, outs) in enumerate(zip(plans, results)):
+            L = len(plan)
+            # create room variables x_{i,j}; x_{i,0} is the starting room itself
+            xs = [x0] + [BitVec(f"x_{i}_{j}", w) for j in range(1, L + 1)]
+            # steps: each x_{i,j+1} is bounded exactly once
+            for j, c in enumerate(plan):
+                s.add(xs[j + 1] == self.room_of(delta(Concat(xs[j], doors[c]))))
+                s.add(inQ(xs[j + 1], N))
+            # labels: include starting room and each subsequent state
+            for j in range(L + 1):
+                s.add(label(xs[j]) == colors[int(outs[j])])
+
+    def room_of(self, p):
+        return Extract(self.w + 2, 3, p)
+
+    def door_of(self, p):
+        return Extract(2, 0, p)
+
+    def room(self, q: int):
+        return BitVecVal(q, self.w)
+
+    def door(self, c: int):
+        return BitVecVal(c, 3)
+
+    def port(self, q: int, c: int):
+        return Concat(self.room(q), self.door(c))
+
+    def solve(
+        self, check_unique: bool = False
+    ) -> Tuple[Dict[int, int], Dict[Tuple[int, int], Tuple[int, int]], Optional[bool]]:
+        """solve_with_N on this encoding."""
+        s, delta, label, N = self.s, self.delta, self.label, self.N
+        if not (0 <= self.starting_room < N) or s.check() != sat:
+            raise AssertionError(
+                "UNSAT with given N; try a larger N or check input traces."
+            )
+        m = s.model()
+
+        is_unique = None
+        if check_unique:
+            s.push()
+            blocking_clauses = []
+            for q in range(N):
+                blocking_clauses.append(label(self.room(q)) != m.eval(label(self.room(q))))
+            for q in range(N):
+                for c in range(6):
+                    p = self.port(q, c)
+                    blocking_clauses.append(delta(p) != m.eval(delta(p)))
+            s.add(Or(blocking_clauses))
+            is_unique = s.check() != sat
+            s.pop()
+
+        # Extract label map
+        labels: Dict[int, int] = {}
+        for q in range(N):
+            lv = m.eval(label(self.room(q)), model_completion=True)
+            labels[q] = int(lv.as_long())
+
+        # Extract delta map for all ports
+        delta_map: Dict[Tuple[int, int], Tuple[int, int]] = {}
+        for q in range(N):
+            for c in range(6):
+                pr = m.eval(delta(self.port(q, c)), model_completion=True)
+                q2 = m.eval(self.room_of(pr), model_completion=True).as_long()
+                e = m.eval(self.door_of(pr), model_completion=True).as_long()
+                delta_map[(q, c)] = (int(q2), int(e))
+
+        return labels, delta_map, is_unique
+
+
 def solve_with_N(
     N: int,
     plans: List[List[int]],
     results: List[List[int]],
     starting_room: int = 0,
     check_unique: bool = False,
+    bitblast: bool = False,
 ) -> Tuple[Dict[int, int], Dict[Tuple[int, int], Tuple[int, int]], Optional[bool]]:
     """Return (labels, delta_map, is_unique) where
        labels[q] -> int in 0..3,  delta_map[(q,c)] -> (q2,e).
     Raises AssertionError if UNSAT.
     """
-    # Build SMT objects
-    PortDT = Datatype("Port")
-    PortDT.declare("mkP", ("room", IntSort()), ("door", IntSort()))
-    Port = PortDT.create()
-
-    mkP = Port.mkP
-    room_of = Port.room
-    door_of = Port.door
-
-    delta = Function("delta", Port, Port)
-    label = Function("label", IntSort(), BitVecSort(2))
-
-    s = Solver()
-
-    # Involution and guard constraints: for all q in [0..N-1], c in [0..5]
-    for q in range(N):
-        for c in range(6):
-            p = mkP(IntVal(q), IntVal(c))
-            p2 = delta(p)
-            # Guard codomain
-            s.add(inQ(room_of(p2), N))
-            s.add(inDoor(door_of(p2)))
-            # Involution: delta(delta(p)) == p
-            s.add(delta(p2) == p)
-
-    # Trace constraints
-    for i, (plan, outs) in enumerate(zip(plans, results)):
-        L = len(plan)
-        # create Int variables x_{i,j}
-        from z3 import Int
-
-        xs = [Int(f"x_{i}_{j}") for j in range(L + 1)]
-        # init
-        s.add(xs[0] == IntVal(starting_room))
-        s.add(inQ(xs[0], N))
-        # steps
-        for j, c in enumerate(plan):
-            s.add(inQ(xs[j], N))
-            p = mkP(xs[j], IntVal(c))
-            next_room = room_of(delta(p))
-            s.add(xs[j + 1] == next_room)
-            s.add(inQ(xs[j + 1], N))
-        # labels: include starting room and each subsequent state
-        for j in range(L + 1):
-            s.add(label(xs[j]) == BitVecVal(int(outs[j]), 2))
-
-    # Solve
-    if s.check() != sat:
-        raise AssertionError(
-            "UNSAT with given N; try a larger N or check input traces."
-        )
-    m = s.model()
-
-    is_unique = None
-    if check_unique:
-        s.push()
-        blocking_clauses = []
-        for q in range(N):
-            blocking_clauses.append(label(IntVal(q)) != m.eval(label(IntVal(q))))
-        for q in range(N):
-            for c in range(6):
-                p = mkP(IntVal(q), IntVal(c))
-                blocking_clauses.append(delta(p) != m.eval(delta(p)))
-        s.add(Or(blocking_clauses))
-        is_unique = s.check() != sat
-        s.pop()
-
-    # Extract label map
-    labels: Dict[int, int] = {}
-    for q in range(N):
-        lv = m.eval(label(IntVal(q)), model_completion=True)
-        labels[q] = int(lv.as_long())
-
-    # Extract delta map for all ports
-    delta_map: Dict[Tuple[int, int], Tuple[int, int]] = {}
-    for q in range(N):
-        for c in range(6):
-            p = mkP(IntVal(q), IntVal(c))
-            pr = m.eval(delta(p), model_completion=True)
-            q2 = m.eval(room_of(pr), model_completion=True).as_long()
-            e = m.eval(door_of(pr), model_completion=True).as_long()
-            delta_map[(q, c)] = (int(q2), int(e))
-
-    return labels, delta_map, is_unique
+    return MapEncoding(N, plans, results, starting_room, bitblast).solve(check_unique)
 
 
 def build_map_json(
@@ -233,17 +295,18 @@ def try_solve(
     minN: int,
     maxN: int,
     check_unique: bool = False,
+    bitblast: bool = False,
 ):
     if N_opt is not None:
         labels, dmap, is_unique = solve_with_N(
-            N_opt, plans, results, starting, check_unique
+            N_opt, plans, results, starting, check_unique, bitblast
         )
         return N_opt, labels, dmap, is_unique
     # sweep N upward to find a SAT model
     for N in range(minN, maxN + 1):
         try:
             labels, dmap, is_unique = solve_with_N(
-                N, plans, results, starting, check_unique
+                N, plans, results, starting, check_unique, bitblast
             )
             return N, labels, dmap, is_unique
         except AssertionError:
@@ -275,6 +338,11 @@ def main():
         action="store_true",
         help="Check if the found solution is unique",
     )
+    ap.add_argument(
+        "--bitblast",
+        action="store_true",
+        help="Solve via Ackermannization + bit-blasting + SAT instead of the default SMT solver",
+    )
     args = ap.parse_args()
 
     if args.verbose > 0:
@@ -292,6 +360,7 @@ def main():
         args.minN,
         args.maxN,
         args.check_unique,
+        args.bitblast,
     )
     mjson = build_map_json(N, labels, dmap, starting)
 
@@ -0,0 +1,79 @@
+import gzip
+from pathlib import Path
+import sys
+
+import numpy as np
+import pytest
+from pysat.formula import CNF
+
+# Ensure repository root is on sys.path for direct module import
+ROOT = Path(__file__).resolve().parents[1]
+if str(ROOT) not in sys.path:
+    sys.path.insert(0, str(ROOT))
+
+import kissat as ks
+
+
+def fill(sink):
+    """Feed the same small formula through every clause entry point of a sink."""
+    sink.append([1, -2, 3])
+    sink.extend([[-1], [2, 4], [-3, -4, 5, -6]])
+    ks.extend_clause_array(sink, np.array([[1, 2], [-5, 6], [3, -4]], dtype=np.int32))
+    sink.append([7])
+    sink.nv = 7
+    return sink
+
+
+def open_writer(path, kind):
+    if kind == "gzip":
+        return ks.GzipDimacsWriter(open(path, "wb"))
+    return ks.DimacsWriter(open(path, "w"))
+
+
+def close_writer(writer, kind):
+    writer.finish()
+    (writer.raw if kind == "gzip" else writer.fp).close()
+
+
+@pytest.mark.parametrize("kind,suffix", [("plain", ".cnf"), ("gzip", ".cnf.gz")])
+def test_writer_round_trip(tmp_path, kind, suffix):
+    expected = fill(ks.ClauseList(2)).to_cnf()
+    path = tmp_path / f"formula{suffix}"
+    writer = fill(open_writer(path, kind))
+    close_writer(writer, kind)
+
+    assert writer.nclauses == len(expected.clauses)
+    # pysat takes nv from the literals, so check the patched header separately
+    with (gzip.open(path, "rt") if kind == "gzip" else open(path)) as fp:
+        assert [line for line in fp if line.startswith("p ")] == [f"p cnf 7 {len(expected.clauses)}\n"]
+    cnf = CNF(from_file=str(path))
+    assert cnf.nv == expected.nv
+    assert cnf.clauses == expected.clauses
+
+
+def test_write_dimacs_round_trip(tmp_path):
+    expected = fill(ks.ClauseList(2)).to_cnf()
+    path = tmp_path / "formula.cnf"
+    with open(path, "w") as fp:
+        ks.write_dimacs(fp, expected)
+
+    with open(path) as fp:
+        assert fp.readline() == f"p cnf 7 {len(expected.clauses)}\n"
+    cnf = CNF(from_file=str(path))
+    assert cnf.nv == expected.nv
+    assert cnf.clauses == expected.clauses
+
+
+@pytest.mark.parametrize("kind,suffix", [("plain", ".cnf"), ("gzip", ".cnf.gz")])
+def test_build_cnf_streamed_matches_in_memory(tmp_path, kind, suffix):
+    plans = [[0, 1, 2, 3], [5, 4]]
+    results = [[0, 1, 2, 3, 0], [0, 2, 1]]
+    expected, _ = ks.build_cnf(plans, results, N=3)
+
+    path = tmp_path / f"formula{suffix}"
+    writer, _ = ks.build_cnf(plans, results, N=3, fp=open_writer(path, kind))
+    (writer.raw if kind == "gzip" else writer.fp).close()
+
+    cnf = CNF(from_file=str(path))
+    assert cnf.nv == expected.nv
+    assert cnf.clauses == expected.clauses
@@ -0,0 +1,157 @@
+from pathlib import Path
+import sys
+
+import numpy as np
+import pytest
+
+# Ensure repository root is on sys.path for direct module import
+ROOT = Path(__file__).resolve().parents[1]
+if str(ROOT) not in sys.path:
+    sys.path.insert(0, str(ROOT))
+
+import kissat as ks
+
+
+@pytest.mark.parametrize("T,N,D,seed", [(1, 1, 1, 0), (1, 3, 6, 1), (4, 2, 1, 2), (7, 4, 6, 3), (12, 5, 3, 4)])
+def test_transition_block_kernels_agree(T, N, D, seed):
+    rng = np.random.default_rng(seed)
+    doors = rng.integers(0, D, size=T).astype(np.intp)
+    X_arr = np.arange(1, (T + 1) * N + 1, dtype=np.int32).reshape(T + 1, N)
+    M_grid = np.arange(1000, 1000 + N * D * N, dtype=np.int32).reshape(N, D, N)
+
+    expected = ks._transition_block_numpy(doors, X_arr, M_grid)
+    assert expected.shape == (2 * T * N * N, 3)
+    np.testing.assert_array_equal(ks._transition_block_loop(doors, X_arr, M_grid), expected)
+    np.testing.assert_array_equal(ks.transition_block(doors, X_arr, M_grid), expected)
+
+
+def test_transition_block_clause_order():
+    doors = np.array([1], dtype=np.intp)
+    X_arr = np.array([[1, 2], [3, 4]], dtype=np.int32)
+    M_grid = np.arange(10, 18, dtype=np.int32).reshape(2, 2, 2)
+    clauses = ks.transition_block(doors, X_arr, M_grid).tolist()
+    # from room 0 through door 1 to room 0: M_grid[0, 1, 0] == 12
+    assert clauses[:2] == [[-1, -12, 3], [-1, -3, 12]]
+    assert len(clauses) == 8
+
+
+def baseline_pruning_pairs(plan, obs):
+    """The original triple loop from build_cnf, returning the (t1+1, t2+1) pairs."""
+    pairs = []
+    T = len(plan)
+    for t1 in range(T):
+        for t2 in range(t1 + 1, T):
+            if obs[t1 + 1] != obs[t2 + 1]:
+                continue
+            k = 0
+            j = 1
+            while (t1 + j) < T and (t2 + j) < T and plan[t1 + j] == plan[t2 + j]:
+                k += 1
+                j += 1
+            if k == 0:
+                continue
+            if any(int(obs[t1 + 1 + i]) != int(obs[t2 + 1 + i]) for i in range(1, k + 1)):
+                pairs.append((t1 + 1, t2 + 1))
+    return np.array(pairs, dtype=np.intp).reshape(-1, 2)
+
+
+def random_trace(rng, T, num_actions, num_labels):
+    plan = rng.integers(0, num_actions, size=T).astype(np.int8)
+    obs = rng.integers(0, num_labels, size=T + 1).astype(np.int8)
+    return plan, obs
+
+
+PRUNING_CASES = [
+    (T, num_actions, num_labels, seed)
+    for T in (1, 2, 5, 30, 80)
+    for num_actions, num_labels in ((1, 1), (1, 4), (6, 1), (2, 2), (6, 4))
+    for seed in range(3)
+]
+
+
+@pytest.mark.parametrize("T,num_actions,num_labels,seed", PRUNING_CASES)
+def test_pruning_pairs_match_baseline(T, num_actions, num_labels, seed):
+    rng = np.random.default_rng(seed)
+    plan, obs = random_trace(rng, T, num_actions, num_labels)
+    expected = baseline_pruning_pairs(plan.tolist(), obs.tolist())
+
+    np.testing.assert_array_equal(ks._pruning_pairs_numpy(plan, obs), expected)
+    np.testing.assert_array_equal(ks.pruning_pairs(plan, obs), expected)
+    # the kernel source run by the interpreter, as without numba
+    hits = np.argwhere(ks._pruning_hits_loop(plan, obs)) + 1
+    np.testing.assert_array_equal(hits.reshape(-1, 2), expected)
+
+
+def test_find_pruning_pairs_lists():
+    plan = [0, 1, 0, 1, 2]
+    obs = [0, 1, 2, 1, 3, 0]
+    np.testing.assert_array_equal(ks.find_pruning_pairs(plan, obs), baseline_pruning_pairs(plan, obs))
+
+
+@pytest.mark.parametrize(
+    "plan",
+    ["", "0", "5", "0123450123", "9" * 64, "01a3", "x", "0123 ", "12345678901234567890/"],
+)
+def test_plan_digits_kernels_agree(plan):
+    buf = np.frombuffer(plan.encode("ascii"), dtype=np.uint8)
+    expected_bad = next((i for i, c in enumerate(plan) if not c.isdigit()), -1)
+    for fn in (ks._plan_digits_numpy, ks._plan_digits_loop, ks.plan_digits):
+        digits, bad = fn(buf)
+        assert bad == expected_bad
+        prefix = len(plan) if bad < 0 else bad
+        assert digits[:prefix].tolist() == [int(c) for c in plan[:prefix]]
+
+
+def test_normalize_plan_rejects_non_digits():
+    assert ks.normalize_plan("0125") == [0, 1, 2, 5]
+    with pytest.raises(ValueError, match="'a'"):
+        ks.normalize_plan("01a")
+
+
+def baseline_trace_mismatches(match, labels, plan, obs, D):
+    """Step-by-step replay as in verify_solution."""
+    cur = ks.STARTING_ROOM_ID
+    bad = int(labels[cur] != obs[0])
+    for t, a in enumerate(plan):
+        if not (0 <= a < D) or match[cur * D + a] < 0:
+            return -1
+        cur = match[cur * D + a] // D
+        bad += int(labels[cur] != obs[t + 1])
+    return bad
+
+
+def random_matching(rng, N, D, unmatched=0):
+    ports = rng.permutation(N * D).tolist()
+    match = [-1] * (N * D)
+    while len(ports) >= 2:
+        p, q = ports.pop(), ports.pop()
+        match[p], match[q] = q, p
+    for p in rng.choice(N * D, size=unmatched, replace=False).tolist():
+        match[p] = -1
+    return match
+
+
+@pytest.mark.parametrize(
+    "N,D,T,unmatched,num_labels,seed",
+    [(1, 1, 1, 0, 1, 0), (1, 6, 1, 0, 4, 1), (3, 6, 1, 0, 4, 2), (4, 6, 20, 0, 4, 3), (6, 6, 50, 0, 1, 4), (6, 6, 40, 4, 4, 5), (5, 3, 30, 0, 2, 6)],
+)
+def test_trace_mismatches_kernels_agree(N, D, T, unmatched, num_labels, seed):
+    rng = np.random.default_rng(seed)
+    match = random_matching(rng, N, D, unmatched)
+    next_room = ks.next_room_table(match, D)
+    labels = rng.integers(0, num_labels, size=N).astype(np.int32)
+    for _ in range(5):
+        plan = rng.integers(0, D, size=T).tolist()
+        obs = rng.integers(0, num_labels, size=T + 1).tolist()
+        expected = baseline_trace_mismatches(match, labels.tolist(), plan, obs, D)
+        assert ks.trace_mismatches(next_room, labels, plan, obs, D) == expected
+        assert ks._trace_mismatches_loop(next_room.tolist(), labels.tolist(), plan, obs, D) == expected
+        assert ks._trace_mismatches_loop(next_room, labels, np.asarray(plan), np.asarray(obs), D) == expected
+
+
+def test_trace_mismatches_out_of_range_action():
+    match = random_matching(np.random.default_rng(0), 2, 6)
+    next_room = ks.next_room_table(match, 6)
+    labels = np.zeros(2, dtype=np.int32)
+    assert ks.trace_mismatches(next_room, labels, [6], [0, 0], 6) == -1
+    assert ks._trace_mismatches_loop(next_room.tolist(), labels.tolist(), [-1], [0, 0], 6) == -1
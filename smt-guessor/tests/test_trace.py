@@ -0,0 +1,40 @@
+import copy
+import json
+from pathlib import Path
+import sys
+
+import matplotlib
+
+matplotlib.use("Agg")
+
+# Ensure repository root is on sys.path for direct module import
+ROOT = Path(__file__).resolve().parents[1]
+if str(ROOT) not in sys.path:
+    sys.path.insert(0, str(ROOT))
+
+import trace as tr
+
+
+def load_map():
+    with open(ROOT / "example" / "map-secundus.json") as f:
+        map_json = json.load(f)
+    N = len(map_json["rooms"])
+    return map_json, tr.layout_positions(N, radius=max(4.0, 2.0 + 0.6 * N))
+
+
+def test_rad_cache_reused_for_same_map():
+    map_json, pos = load_map()
+    rad_cache = tr._build_rad_cache(map_json, pos)
+    assert tr._build_rad_cache(copy.deepcopy(map_json), pos.copy()) is rad_cache
+
+
+def test_rad_cache_rebuilt_after_in_place_edit():
+    map_json, pos = load_map()
+    before = tr._build_rad_cache(map_json, pos)
+    # rewire one door: same dict, same number of connections
+    conn = map_json["connections"][0]
+    conn["to"]["door"] = (conn["to"]["door"] + 1) % 6
+    after = tr._build_rad_cache(map_json, pos)
+    assert after is not before
+    assert after == tr._build_rad_cache(copy.deepcopy(map_json), pos)
+    assert set(after) != set(before)
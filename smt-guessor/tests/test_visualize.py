@@ -0,0 +1,74 @@
+from pathlib import Path
+import sys
+
+import matplotlib
+
+matplotlib.use("Agg")
+
+import matplotlib.pyplot as plt
+import numpy as np
+import pytest
+
+# Ensure repository root is on sys.path for direct module import
+ROOT = Path(__file__).resolve().parents[1]
+if str(ROOT) not in sys.path:
+    sys.path.insert(0, str(ROOT))
+
+import visualize as vz
+
+# Three rooms and one connection from door 0 (+Y) of room 0 to door 0 of room 1.
+# Rooms sit symmetrically about the x axis, so only the edge tells up from down.
+SMALL_MAP = {
+    "rooms": [0, 1, 2],
+    "startingRoom": 0,
+    "connections": [{"from": {"room": 0, "door": 0}, "to": {"room": 1, "door": 0}}],
+}
+
+
+def test_visualize_map_defaults_to_matplotlib():
+    fig, ax = vz.visualize_map(SMALL_MAP, figsize=(4, 4))
+    try:
+        assert not ax.images
+        assert ax.collections
+    finally:
+        plt.close(fig)
+
+
+def test_visualize_map_rejects_unknown_backend():
+    with pytest.raises(ValueError, match="backend"):
+        vz.visualize_map(SMALL_MAP, backend="auto")
+
+
+def test_visualize_map_datashader(tmp_path):
+    pytest.importorskip("datashader")
+    pytest.importorskip("pandas")
+
+    output = tmp_path / "map.png"
+    fig, ax = vz.visualize_map(SMALL_MAP, output=str(output), figsize=(4, 4), backend="datashader")
+    try:
+        assert output.stat().st_size > 0
+        (image,) = ax.images
+        rgba = np.asarray(image.get_array())
+        h, w = rgba.shape[:2]
+        assert rgba.shape == (h, w, 4) and rgba.dtype == np.uint8
+        alpha = rgba[:, :, 3]
+        # opaque black strokes on a transparent background
+        assert alpha.max() == 255 and alpha.min() == 0
+        assert not rgba[alpha == 255, :3].any()
+
+        x0, x1, y0, y1 = image.get_extent()
+
+        def alpha_near(x, y):
+            # with origin="lower", row 0 of the array is at y0
+            col = int((x - x0) / (x1 - x0) * w)
+            row = int((y - y0) / (y1 - y0) * h)
+            return alpha[max(row - 2, 0) : row + 3, max(col - 2, 0) : col + 3]
+
+        N = len(SMALL_MAP["rooms"])
+        pos = vz.layout_positions(N, radius=max(4.0, 2.0 + 0.6 * N))
+        x, y, _ = vz.door_anchors(pos)[0, 0]
+        # the edge leaves room 0 above its hexagon; the mirror point below is empty
+        assert alpha_near(x, y).max() == 255
+        assert alpha_near(x, -y).max() == 0
+    finally:
+        plt.close(fig)
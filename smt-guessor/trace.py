@@ -1,45 +1,63 @@
 import argparse
-import json
-from dataclasses import dataclass
 from typing import Dict, List, Tuple
 
 import matplotlib.pyplot as plt
+import numpy as np
+from matplotlib.collections import PolyCollection
 from matplotlib.patches import RegularPolygon, Arc, Rectangle
 
 # Reuse helpers from visualize.py to keep a consistent look
 from visualize import (
     normalize_map,  # type: ignore
     layout_positions,  # type: ignore
-    hex_door_anchor,  # type: ignore
+    door_anchors,  # type: ignore
     draw_map_on_axes,  # type: ignore
     pick_rad,  # type: ignore
+    pick_rad_batch,  # type: ignore
+    arc3_curves,  # type: ignore
+    load_json,  # type: ignore
+    hex_vertices,  # type: ignore
+    map_edges,  # type: ignore
+)
+from matplotlib.lines import Line2D
+
+
+# One row per observation; simulate_steps returns a np.recarray of these, so
+# steps.mismatch is a whole column and steps[i].to_room a single field.
+STEP_DTYPE = np.dtype(
+    [
+        ("index", "i4"),  # observation index in results (0-based)
+        ("from_room", "i2"),
+        ("door", "i1"),  # -1 indicates observation at current room (no move)
+        ("to_room", "i2"),
+        ("observed", "i1"),
+        ("expected", "i1"),
+        ("mismatch", "?"),
+    ]
 )
-from matplotlib.patches import FancyArrowPatch
-
 
-@dataclass
-class Step:
-    index: int  # observation index in results (0-based)
-    from_room: int
-    door: int  # -1 indicates observation at current room (no move)
-    to_room: int
-    observed: int
-    expected: int
-    mismatch: bool
+# _build_rad_cache results for the most recent maps, keyed by the bytes of their
+# edge array and layout, so a map edited in place gets a fresh entry
+RAD_CACHE_MAPS = 8
+_RAD_CACHE_MEMO: Dict[Tuple[bytes, bytes, float], dict] = {}
 
 
-def build_conn_map(conns: List[dict]) -> Dict[Tuple[int, int], Tuple[int, int]]:
-    """Create a bidirectional mapping (room, door) -> (room, door)."""
-    m: Dict[Tuple[int, int], Tuple[int, int]] = {}
-    for c in conns:
-        a = (int(c["from"]["room"]), int(c["from"]["door"]))
-        b = (int(c["to"]["room"]), int(c["to"]["door"]))
-        m[a] = b
-        m[b] = a
-    return m
+def build_conn_arrays(conns: List[dict], N: int) -> Tuple[np.ndarray, np.ndarray]:
+    """Create bidirectional (N, 6) tables next_room / next_door; -1 where a door is unconnected."""
+    next_room = np.full((N, 6), -1, dtype=np.int16)
+    next_door = np.full((N, 6), -1, dtype=np.int16)
+    if conns:
+        ends = np.array(
+            [(c["from"]["room"], c["from"]["door"], c["to"]["room"], c["to"]["door"]) for c in conns], dtype=np.int64
+        )
+        # both directions in two scatters; a connection listed twice (a->b and b->a) just rewrites the same cells
+        qa, da, qb, db = ends.T
+        next_room[qa, da], next_door[qa, da] = qb, db
+        next_room[qb, db], next_door[qb, db] = qa, da
+    return next_room, next_door
 
 
-def simulate_steps(map_json: dict, trace_json: dict, plan_index: int = 0) -> List[Step]:
+def simulate_steps(map_json: dict, trace_json: dict, plan_index: int = 0) -> np.recarray:
     """Follow the plan over the map, pairing each move with an observation.
 
     Assumes a plan is a string of digits (0..5) indicating doors to take.
@@ -47,7 +65,7 @@ def simulate_steps(map_json: dict, trace_json: dict, plan_index: int = 0) -> Lis
     to the label of the room just entered.
     """
     N, rooms, conns, start = normalize_map(map_json)
-    conn = build_conn_map(conns)
+    next_room = build_conn_arrays(conns, N)[0].tolist()
 
     # Select plan and results
     plans: List[str] = trace_json.get("plans", [])
@@ -63,78 +81,99 @@ def simulate_steps(map_json: dict, trace_json: dict, plan_index: int = 0) -> Lis
 
     # Observations: results[0] compares the startingRoom's label
     cur = int(trace_json.get("startingRoom", start))
-    steps: List[Step] = []
-
-    if len(results) >= 1:
-        obs0 = int(results[0])
-        exp0 = int(rooms[cur])
-        steps.append(
-            Step(index=0, from_room=cur, door=-1, to_room=cur, observed=obs0, expected=exp0, mismatch=(obs0 != exp0))
-        )
 
     # Subsequent observations correspond to moves in the plan
     # results[i+1] compares the label of the room reached after plan[i]
     max_moves = min(len(plan), max(0, len(results) - 1))
-    for i in range(max_moves):
-        dch = plan[i]
-        if dch < "0" or dch > "9":
-            raise ValueError(f"Invalid door digit '{dch}' at plan index {i}")
-        door = int(dch)
-        if door < 0 or door > 5:
-            # Only doors 0..5 are valid
-            continue
-        key = (cur, door)
-        if key not in conn:
-            # No connection: remain in place
-            nxt = cur
-        else:
-            nxt, _ = conn[key]
-        exp = int(rooms[nxt])
-        obs = int(results[i + 1])
-        steps.append(
-            Step(index=i + 1, from_room=cur, door=door, to_room=nxt, observed=obs, expected=exp, mismatch=(obs != exp))
-        )
-        cur = nxt
+    digits = np.frombuffer(plan[:max_moves].encode("ascii", "replace"), dtype=np.uint8).astype(np.int16) - 48
+    bad = np.flatnonzero((digits < 0) | (digits > 9))
+    if bad.size:
+        i = int(bad[0])
+        raise ValueError(f"Invalid door digit '{plan[i]}' at plan index {i}")
+    # Only doors 0..5 are valid; other digits are skipped without a step
+    moves = np.flatnonzero(digits <= 5)
+    doors = digits[moves].tolist()
+
+    # The walk itself is sequential; it only touches plain ints in plain lists
+    start_room = cur
+    path: List[int] = []
+    append = path.append
+    for door in doors:
+        nr = next_room[cur][door]
+        # No connection (-1): remain in place
+        if nr >= 0:
+            cur = nr
+        append(cur)
+
+    head = 1 if len(results) >= 1 else 0
+    steps = np.recarray(head + len(doors), dtype=STEP_DTYPE)
+    if head:
+        obs0 = int(results[0])
+        exp0 = int(rooms[start_room])
+        steps[0] = (0, start_room, -1, start_room, obs0, exp0, obs0 != exp0)
+    if doors:
+        moved = steps[head:]
+        moved.index = moves + 1
+        moved.from_room = [start_room] + path[:-1]
+        moved.door = doors
+        moved.to_room = path
+        moved.expected = np.asarray(rooms, dtype=np.int64)[path]
+        moved.observed = np.asarray(results[: max_moves + 1], dtype=np.int64)[moves + 1]
+        moved.mismatch = moved.expected != moved.observed
 
     return steps
 
 
-def _build_rad_cache(map_json: dict, pos: Dict[int, Tuple[float, float]], r_hex: float = 1.0):
+def _build_rad_cache(map_json: dict, pos: np.ndarray, r_hex: float = 1.0):
     """Precompute the exact curvature (rad) used in the base map for each edge.
 
-    Returns mapping: key = tuple(sorted([(qa,da),(qb,db)])) -> {
+    Returns mapping: key = min/max-ordered ((qa,da),(qb,db)) -> {
         'rad': float,
         'a': (qa,da),
         'b': (qb,db)
     } where (qa,da)->(qb,db) is the orientation actually drawn in the base map.
+    Repeated calls with the same edges, pos and r_hex return the cached mapping.
     """
-    conns = map_json["connections"]
-    door_anchor: Dict[Tuple[int, int], Tuple[float, float, float]] = {}
-    # prime anchors
-    for q, (cx, cy) in pos.items():
-        for d in range(6):
-            door_anchor[(q, d)] = hex_door_anchor(cx, cy, d, r_room=r_hex * 1.2)
-
+    # the same edges, orientations and curvatures as draw_map_on_axes, in one batch
+    edges = map_edges(map_json["connections"], len(pos))
+    memo_key = (edges.tobytes(), np.asarray(pos, dtype=float).tobytes(), r_hex)
+    hit = _RAD_CACHE_MEMO.get(memo_key)
+    if hit is not None:
+        return hit
     rad_cache: Dict[Tuple[Tuple[int, int], Tuple[int, int]], Dict] = {}
-    drawn = set()
-    for item in conns:
-        qa = int(item["from"]["room"])
-        da = int(item["from"]["door"])
-        qb = int(item["to"]["room"])
-        db = int(item["to"]["door"])
-        key = tuple(sorted([(qa, da), (qb, db)]))
-        if key in drawn:
-            continue
-        drawn.add(key)
-        a = door_anchor[(qa, da)]
-        b = door_anchor[(qb, db)]
-        rad = pick_rad(qa, da, qb, db, (pos[qa][0], pos[qa][1]), (pos[qb][0], pos[qb][1]))
-        rad_cache[key] = {"rad": rad, "a": (qa, da), "b": (qb, db)}
+    if len(edges):
+        qa, da, qb, db = edges.T
+        # draw_map_on_axes measures each edge between its door anchors, not room centers
+        anchors = door_anchors(pos, r_room=r_hex * 1.2)
+        rads = pick_rad_batch(qa, da, qb, db, anchors[qa, da, :2], anchors[qb, db, :2])
+        for (qa, da, qb, db), rad in zip(edges.tolist(), rads.tolist()):
+            pa, pb = (qa, da), (qb, db)
+            # canonical (min, max) order, same key as tuple(sorted(...)) without the list and sort
+            key = (pa, pb) if pa <= pb else (pb, pa)
+            rad_cache[key] = {"rad": rad, "a": pa, "b": pb}
+    _RAD_CACHE_MEMO[memo_key] = rad_cache
+    if len(_RAD_CACHE_MEMO) > RAD_CACHE_MAPS:
+        _RAD_CACHE_MEMO.pop(next(iter(_RAD_CACHE_MEMO)))
     return rad_cache
 
 
-def draw_overlay_for_step(ax, map_json: dict, step: Step, pos: Dict[int, Tuple[float, float]], r_hex: float = 1.0, rad_cache: Dict = None):
-    """Overlay current step path and target room highlight."""
+def draw_overlay_for_step(
+    ax,
+    map_json: dict,
+    step: np.record,
+    pos: np.ndarray,
+    r_hex: float = 1.0,
+    rad_cache: Dict = None,
+    conn_arrays: Tuple[np.ndarray, np.ndarray] = None,
+    anchors: np.ndarray = None,
+):
+    """Overlay current step path and target room highlight; returns the artists added.
+
+    conn_arrays is build_conn_arrays() of the map and anchors is door_anchors() of pos;
+    pass them to avoid rebuilding them per frame.
+    """
+    if anchors is None:
+        anchors = door_anchors(pos, r_room=r_hex * 1.2)
     color = "red" if step.mismatch else "tab:green"
 
     # Highlight the entered room with a semi-transparent fill ring
@@ -143,23 +182,23 @@ def draw_overlay_for_step(ax, map_json: dict, step: Step, pos: Dict[int, Tuple[f
         (cx, cy), numVertices=6, radius=r_hex * 1.02, orientation=0.5235987755982988, fill=False, lw=4.0, edgecolor=color
     )
     ax.add_patch(ring)
+    artists = [ring]
 
     # If this step is an observation at current room (no move), skip drawing the edge
     if step.door >= 0:
         # Compute door anchors for from and to
-        a_x, a_y, _ = hex_door_anchor(
-            pos[step.from_room][0], pos[step.from_room][1], step.door, r_room=r_hex * 1.2
-        )
+        a_x, a_y, _ = anchors[step.from_room, step.door]
         # Find paired door on the other side
-        conn = build_conn_map(map_json["connections"])  # type: ignore
-        to_pair = conn.get((step.from_room, step.door), (step.to_room, 0))
-        to_door = to_pair[1]
-        b_x, b_y, _ = hex_door_anchor(
-            pos[step.to_room][0], pos[step.to_room][1], to_door, r_room=r_hex * 1.2
-        )
+        if conn_arrays is None:
+            conn_arrays = build_conn_arrays(map_json["connections"], len(map_json["rooms"]))
+        to_door = int(conn_arrays[1][step.from_room, step.door])
+        if to_door < 0:
+            to_door = 0
+        b_x, b_y, _ = anchors[step.to_room, to_door]
 
         # Determine curvature exactly as base map used
-        edge_key = tuple(sorted([(step.from_room, step.door), (step.to_room, to_door)]))
+        pa, pb = (step.from_room, step.door), (step.to_room, to_door)
+        edge_key = (pa, pb) if pa <= pb else (pb, pa)
         if rad_cache and edge_key in rad_cache:
             info = rad_cache[edge_key]
             # If our orientation matches the stored one, use rad; otherwise invert sign
@@ -168,28 +207,16 @@ def draw_overlay_for_step(ax, map_json: dict, step: Step, pos: Dict[int, Tuple[f
             else:
                 rad = -info["rad"]
         else:
-            # Fallback to local computation
-            rad = pick_rad(
-                step.from_room,
-                step.door,
-                step.to_room,
-                to_door,
-                (pos[step.from_room][0], pos[step.from_room][1]),
-                (pos[step.to_room][0], pos[step.to_room][1]),
-            )
-
-        patch = FancyArrowPatch(
-            (a_x, a_y),
-            (b_x, b_y),
-            arrowstyle="-",
-            mutation_scale=1,
-            connectionstyle=f"arc3,rad={rad}",
-            lw=3.5,
-            color=color,
-            alpha=0.95,
-            zorder=50,
-        )
-        ax.add_patch(patch)
+            # Fallback to local computation, between the same anchors as the base map
+            rad = pick_rad(step.from_room, step.door, step.to_room, to_door, (a_x, a_y), (b_x, b_y))
+
+        # Same sampled arc3 curve as the base map's LineCollection; a self loop
+        # has coincident ends and is drawn as an Arc below instead
+        if abs(a_x - b_x) >= 1e-8 or abs(a_y - b_y) >= 1e-8:
+            curve = arc3_curves([(a_x, a_y)], [(b_x, b_y)], np.array([rad]))[0]
+            line = Line2D(curve[:, 0], curve[:, 1], lw=3.5, color=color, alpha=0.95, zorder=50)
+            ax.add_line(line)
+            artists.append(line)
     # Self-loop overlay ONLY when the map edge is (room, door) -> (room, door)
     # i.e., same room and same door on both ends. For same room but different
     # doors, base map uses a curved connection between two anchors, so we skip
@@ -197,9 +224,7 @@ def draw_overlay_for_step(ax, map_json: dict, step: Step, pos: Dict[int, Tuple[f
     if step.door >= 0 and step.from_room == step.to_room and to_door == step.door:
         # place a loop outside the hex near the door angle, matching visualize.draw_self_loop geometry
         import math as _math
-        ax_x, ax_y, ang = hex_door_anchor(
-            pos[step.from_room][0], pos[step.from_room][1], step.door, r_room=r_hex * 1.2
-        )
+        ax_x, ax_y, ang = anchors[step.from_room, step.door]
         ux, uy = _math.cos(ang), _math.sin(ang)
         cx = ax_x + ux * 0.35
         cy = ax_y + uy * 0.35
@@ -207,30 +232,26 @@ def draw_overlay_for_step(ax, map_json: dict, step: Step, pos: Dict[int, Tuple[f
             (cx, cy), 0.9, 0.9, angle=_math.degrees(ang), theta1=210, theta2=510, lw=3.2, color=color, zorder=50
         )
         ax.add_patch(arc)
+        artists.append(arc)
+    return artists
 
 
-def compute_mismatch_rooms(steps: List[Step]) -> List[int]:
-    seen = set()
-    for s in steps:
-        if s.mismatch:
-            seen.add(s.to_room)
-    return sorted(seen)
-
-
-def draw_all_mismatch_highlights(ax, mismatch_rooms: List[int], pos: Dict[int, Tuple[float, float]], r_hex: float = 1.0):
-    for q in mismatch_rooms:
-        cx, cy = pos[q]
-        patch = RegularPolygon(
-            (cx, cy),
-            numVertices=6,
-            radius=r_hex * 0.95,
-            orientation=0.5235987755982988,
-            fill=True,
-            facecolor=(1.0, 0.0, 0.0, 0.12),
-            edgecolor=None,
-            lw=0,
-        )
-        ax.add_patch(patch)
+def compute_mismatch_rooms(steps: np.recarray) -> List[int]:
+    return np.unique(steps.to_room[steps.mismatch]).tolist()
+
+
+def draw_all_mismatch_highlights(ax, mismatch_rooms: List[int], pos: np.ndarray, r_hex: float = 1.0):
+    """Fill every mismatch room in one PolyCollection; returns [collection] (empty if none)."""
+    if not mismatch_rooms:
+        return []
+    fill = PolyCollection(
+        hex_vertices(pos[mismatch_rooms], r_hex * 0.95),
+        facecolors=[(1.0, 0.0, 0.0, 0.12)],
+        edgecolors="none",
+        linewidths=0,
+    )
+    ax.add_collection(fill, autolim=False)
+    return [fill]
 
 
 def interactive_trace(map_json: dict, trace_json: dict, plan_index: int = 0, figsize=(8, 8)):
@@ -249,10 +270,14 @@ def interactive_trace(map_json: dict, trace_json: dict, plan_index: int = 0, fig
     pos = layout_positions(N, radius=max(4.0, 2.0 + 0.6 * N))
     r_hex = 1.0
     mismatch_rooms = compute_mismatch_rooms(steps)
-    mismatch_indices = [i for i, st in enumerate(steps) if st.mismatch]
+    # sorted, so the [ / ] jumps are a binary search
+    mismatch_indices = np.flatnonzero(steps.mismatch)
     rad_cache = _build_rad_cache(map_json, pos, r_hex=r_hex)
+    conn_arrays = build_conn_arrays(conns, N)
+    anchors = door_anchors(pos, r_room=r_hex * 1.2)
 
-    state = {"idx": 0, "show_mismatch": True}
+    # "background" is the pixel cache of the last full draw, without the animated artists
+    state = {"idx": 0, "show_mismatch": True, "background": None}
 
     # Footer: small English controls help
     footer_text = (
@@ -280,35 +305,60 @@ def interactive_trace(map_json: dict, trace_json: dict, plan_index: int = 0, fig
         progress_ax.set_xlim(0, L)
         progress_ax.set_ylim(0, 1)
         # Draw base segments: red where mismatch, light gray otherwise
-        for i, st in enumerate(steps):
-            color = (0.85, 0.15, 0.15) if st.mismatch else (0.82, 0.82, 0.82)
+        for i, bad in enumerate(steps.mismatch.tolist()):
+            color = (0.85, 0.15, 0.15) if bad else (0.82, 0.82, 0.82)
             rect = Rectangle((i, 0), 1.0, 1.0, facecolor=color, edgecolor=None, lw=0)
             progress_ax.add_patch(rect)
-        # Highlight current index with an outline
-        ci = state["idx"]
-        outline = Rectangle((ci, 0), 1.0, 1.0, facecolor='none', edgecolor='black', lw=1.5)
-        progress_ax.add_patch(outline)
+
+    # Static layers are drawn once and end up in the cached background; only the
+    # animated artists below change per keypress and are blitted on top of it.
+    draw_map_on_axes(ax, map_json, anchors=anchors)
+    highlights = draw_all_mismatch_highlights(ax, mismatch_rooms, pos, r_hex=r_hex)
+    draw_progress_bar()
+    # Highlight current index with an outline
+    outline = Rectangle((0, 0), 1.0, 1.0, facecolor='none', edgecolor='black', lw=1.5, animated=True)
+    progress_ax.add_patch(outline)
+    title = fig.suptitle("", y=0.985, animated=True)
+    overlay: List = []
+
+    def draw_animated():
+        for artist in [*overlay, title, outline]:
+            fig.draw_artist(artist)
+
+    def on_draw(event):
+        # full redraws (first show, resize, 'm') skip animated artists
+        state["background"] = fig.canvas.copy_from_bbox(fig.bbox)
+        draw_animated()
 
     def render():
-        draw_map_on_axes(ax, map_json)
-        if state["show_mismatch"] and mismatch_rooms:
-            draw_all_mismatch_highlights(ax, mismatch_rooms, pos, r_hex=r_hex)
-        if steps:
+        for artist in overlay:
+            artist.remove()
+        overlay.clear()
+        if len(steps):
             s = steps[state["idx"]]
-            draw_overlay_for_step(ax, map_json, s, pos, r_hex=r_hex, rad_cache=rad_cache)
+            overlay.extend(
+                draw_overlay_for_step(ax, map_json, s, pos, r_hex=r_hex, rad_cache=rad_cache, conn_arrays=conn_arrays, anchors=anchors)
+            )
+            for artist in overlay:
+                artist.set_animated(True)
             if s.door < 0:
-                title = (
+                text = (
                     f"obs {s.index+1}/{len(steps)}: room {s.to_room} | expected={s.expected} observed={s.observed}"
                 )
             else:
-                title = (
+                text = (
                     f"step {s.index}/{len(steps)-1}: room {s.from_room} --d{s.door}--> room {s.to_room} | expected={s.expected} observed={s.observed}"
                 )
             if s.mismatch:
-                title += "  [MISMATCH]"
-            fig.suptitle(title, y=0.985)
-        draw_progress_bar()
-        fig.canvas.draw_idle()
+                text += "  [MISMATCH]"
+            title.set_text(text)
+            outline.set_x(state["idx"])
+        if state["background"] is None or not fig.canvas.supports_blit:
+            fig.canvas.draw_idle()
+            return
+        fig.canvas.restore_region(state["background"])
+        draw_animated()
+        fig.canvas.blit(fig.bbox)
 
     def on_key(event):
         key = (event.key or "").lower()
@@ -326,37 +376,29 @@ def interactive_trace(map_json: dict, trace_json: dict, plan_index: int = 0, fig
             render()
         elif key in ("[", "{"):
             # previous mismatch
-            if mismatch_indices:
-                cur = state["idx"]
-                prev = None
-                for idx in reversed(mismatch_indices):
-                    if idx < cur:
-                        prev = idx
-                        break
-                if prev is None:
-                    prev = mismatch_indices[-1]
-                state["idx"] = prev
+            if mismatch_indices.size:
+                # last mismatch before the current index; j == -1 wraps to the last one
+                j = int(np.searchsorted(mismatch_indices, state["idx"], side="left")) - 1
+                state["idx"] = int(mismatch_indices[j])
                 render()
         elif key in ("]", "}"):
             # next mismatch
-            if mismatch_indices:
-                cur = state["idx"]
-                nxt = None
-                for idx in mismatch_indices:
-                    if idx > cur:
-                        nxt = idx
-                        break
-                if nxt is None:
-                    nxt = mismatch_indices[0]
-                state["idx"] = nxt
+            if mismatch_indices.size:
+                # first mismatch after the current index, wrapping to the first one
+                j = int(np.searchsorted(mismatch_indices, state["idx"], side="right"))
+                state["idx"] = int(mismatch_indices[j % mismatch_indices.size])
                 render()
         elif key == "m":
             state["show_mismatch"] = not state["show_mismatch"]
-            render()
+            for artist in highlights:
+                artist.set_visible(state["show_mismatch"])
+            # the highlights are part of the background, so this needs a full redraw
+            fig.canvas.draw_idle()
         elif key == "q":
             plt.close(fig)
 
     fig.canvas.mpl_connect("key_press_event", on_key)
+    fig.canvas.mpl_connect("draw_event", on_draw)
     render()
     plt.show()
 
@@ -371,10 +413,8 @@ def main():
 
     W, H = [float(x) for x in args.figsize.split(",")]
 
-    with open(args.map, "r", encoding="utf-8") as f:
-        map_json = json.load(f)
-    with open(args.trace, "r", encoding="utf-8") as f:
-        trace_json = json.load(f)
+    map_json = load_json(args.map)
+    trace_json = load_json(args.trace)
 
     interactive_trace(map_json, trace_json, plan_index=args.plan_index, figsize=(W, H))
 
@@ -2,10 +2,44 @@ import json
 import math
 import os
 import glob
-from typing import List, Optional, Tuple
+from concurrent.futures import ProcessPoolExecutor
+from typing import Dict, List, Optional, Tuple
 
+import matplotlib
 import matplotlib.pyplot as plt
-from matplotlib.patches import RegularPolygon, FancyArrowPatch, Arc
+import numpy as np
+from matplotlib.collections import LineCollection, PathCollection, PolyCollection
+from matplotlib.patches import Arc
+from matplotlib.textpath import TextPath
+from matplotlib.transforms import Affine2D, IdentityTransform
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+# Rendered frames interactive_browse keeps as pixel snapshots (about 2.5 MB each at 8x8in)
+BROWSE_CACHE_FRAMES = 64
+# How much draw_map_on_axes draws: "full" everything, "rooms-only" no door
+# numbers and no self loops, "auto" drops them above the room counts below
+DETAIL_LEVELS = ("auto", "full", "rooms-only")
+# Above this many rooms detail="auto" leaves out the 6N door number labels
+DOOR_LABEL_MAX_ROOMS = 64
+# ... and above this many the self-loop arcs
+SELF_LOOP_MAX_ROOMS = 200
+# Above this many doors plus connections (about 250 full rooms) the hexagon and
+# connection layers are rasterized in vector output (SVG/PDF); labels stay vector
+# text. Below it the embedded 220 dpi image is larger than the paths it replaces.
+RASTERIZE_MIN_ITEMS = 9 * 256
+# Pillow options for PNG output: fastest zlib level (also smaller than the default
+# for these line drawings, e.g. zain at 220 dpi 624 KB -> 562 KB)
+PNG_PIL_KWARGS = {"compress_level": 1}
+# Renderers of visualize_map: matplotlib artists, or datashader (optional, with
+# pandas) only when asked for explicitly
+BACKENDS = ("matplotlib", "datashader")
+
+# Unit flat-topped hexagon, vertex order of RegularPolygon(numVertices=6, orientation=30deg)
+_HEX_UNIT = np.array([[math.cos(a), math.sin(a)] for a in np.radians(120.0 + 60.0 * np.arange(6))])
 
 
 def normalize_map(m):
@@ -24,19 +58,38 @@ def hex_door_anchor(cx, cy, door_idx, r_room=1.2):
     return x, y, angle
 
 
-def draw_hex(ax, cx, cy, label_text, room_idx, start=False, r_hex=1.0):
-    patch = RegularPolygon(
-        (cx, cy),
-        numVertices=6,
-        radius=r_hex,
-        orientation=math.radians(30),
-        fill=False,
-        lw=3 if start else 1.5,
-    )
-    ax.add_patch(patch)
-    ax.text(
-        cx, cy, f"{room_idx}\n[{label_text}]", ha="center", va="center", fontsize=10
-    )
+# Angle of each door as in hex_door_anchor, and its unit offset from the room center
+_DOOR_ANGLES = np.radians(90.0 - 60.0 * np.arange(6))
+_DOOR_UNIT = np.stack([np.cos(_DOOR_ANGLES), np.sin(_DOOR_ANGLES)], axis=1)
+
+
+def hex_vertices(pos, r_hex=1.0):
+    """Corners of the room hexagon around every center in pos: (N, 6, 2) array."""
+    return np.asarray(pos, dtype=float).reshape(-1, 1, 2) + r_hex * _HEX_UNIT
+
+
+def door_anchors(pos, r_room=1.2):
+    """hex_door_anchor for every room in pos at once: (N, 6, 3) array of (x, y, angle)."""
+    centers = np.asarray(pos, dtype=float).reshape(-1, 2)
+    anchors = np.empty((len(centers), 6, 3))
+    anchors[:, :, :2] = centers[:, None, :] + r_room * _DOOR_UNIT
+    anchors[:, :, 2] = _DOOR_ANGLES
+    return anchors
+
+
+# Outlines of the door digits "0".."5", built on first use by _door_digit_paths
+_DOOR_DIGITS: List = []
+
+
+def _door_digit_paths():
+    """Glyph paths of "0".."5" at a 1pt font size, each centred on (0, 0)."""
+    if not _DOOR_DIGITS:
+        for d in range(6):
+            path = TextPath((0, 0), str(d), size=1)
+            ext = path.get_extents()
+            center = Affine2D().translate(-(ext.x0 + ext.x1) / 2, -(ext.y0 + ext.y1) / 2)
+            _DOOR_DIGITS.append(path.transformed(center))
+    return _DOOR_DIGITS
 
 
 def pick_rad(qa, da, qb, db, a, b):
@@ -50,18 +103,29 @@ def pick_rad(qa, da, qb, db, a, b):
     return sign * mag
 
 
-def draw_connection_curved(ax, a, b, qa, da, qb, db):
-    # Use FancyArrowPatch with arc3 connectionstyle for a smooth curve
-    rad = pick_rad(qa, da, qb, db, a, b)
-    patch = FancyArrowPatch(
-        a,
-        b,
-        arrowstyle="-",
-        mutation_scale=1,
-        connectionstyle=f"arc3,rad={rad}",
-        lw=1.6,
-    )
-    ax.add_patch(patch)
+def pick_rad_batch(qa, da, qb, db, a, b):
+    """pick_rad for many edges at once; a and b are (E, 2) arrays of endpoints."""
+    qa, da, qb, db = (np.asarray(v, dtype=np.int64) for v in (qa, da, qb, db))
+    sign = np.where((qa * 13 + da * 7 + qb * 11 + db * 5) % 2 == 1, 1.0, -1.0)
+    d = np.asarray(b, dtype=float) - np.asarray(a, dtype=float)
+    dist = np.hypot(d[:, 0], d[:, 1])
+    mag = np.clip(0.32 * (1.5 / (1.0 + dist / 6.0)), 0.12, 0.45)
+    return sign * mag
+
+
+def arc3_curves(a, b, rad, n=16):
+    """Sample the arc3,rad=rad curves from a to b as (E, n, 2) polylines.
+
+    Same quadratic Bezier as Matplotlib's arc3 connection style: the control
+    point sits rad * |ab| off the midpoint, perpendicular to ab.
+    """
+    a = np.asarray(a, dtype=float)
+    b = np.asarray(b, dtype=float)
+    d = b - a
+    ctrl = (a + b) / 2.0 + np.asarray(rad, dtype=float)[:, None] * np.stack([d[:, 1], -d[:, 0]], axis=1)
+    t = np.linspace(0.0, 1.0, n)[None, :, None]
+    a, ctrl, b = a[:, None, :], ctrl[:, None, :], b[:, None, :]
+    return (1 - t) ** 2 * a + 2 * (1 - t) * t * ctrl + t**2 * b
 
 
 def draw_self_loop(ax, anchor, angle):
@@ -77,69 +141,193 @@ def draw_self_loop(ax, anchor, angle):
     ax.add_patch(arc)
 
 
+def map_edges(conns, N):
+    """Connections as an (E, 4) int64 array of (qa, da, qb, db) rows.
+
+    One row per undirected edge, in the orientation and order of its first
+    listing; connections with an end outside the N rooms are dropped.
+    """
+    ends = np.array(
+        [(c["from"]["room"], c["from"]["door"], c["to"]["room"], c["to"]["door"]) for c in conns], dtype=np.int64
+    ).reshape(-1, 4)
+    qa, da, qb, db = ends.T
+    ends = ends[(0 <= qa) & (qa < N) & (0 <= qb) & (qb < N) & (0 <= da) & (da < 6) & (0 <= db) & (db < 6)]
+    ka = ends[:, 0] * 6 + ends[:, 1]
+    kb = ends[:, 2] * 6 + ends[:, 3]
+    # an undirected edge as one int: (min, max) door slots packed base 6N
+    _, first = np.unique(np.minimum(ka, kb) * (6 * N) + np.maximum(ka, kb), return_index=True)
+    first.sort()
+    return ends[first]
+
+
 def layout_positions(N, radius=4.0):
+    """Room centers on a circle as an (N, 2) array; pos[q] is (x, y) of room q."""
     if N == 1:
-        return {0: (0.0, 0.0)}
-    pos = {}
-    for i in range(N):
-        theta = 2.0 * math.pi * i / N
-        pos[i] = (radius * math.cos(theta), radius * math.sin(theta))
-    return pos
+        return np.zeros((1, 2))
+    theta = 2.0 * np.pi * np.arange(N) / N
+    return radius * np.stack([np.cos(theta), np.sin(theta)], axis=1)
 
 
-def draw_map_on_axes(ax, map_json):
+def draw_map_on_axes(ax, map_json, anchors=None, detail="auto"):
     """Draw a map JSON on a provided Axes, clearing it first.
 
+    anchors is door_anchors() of the layout; pass it to reuse it across redraws.
+    detail is one of DETAIL_LEVELS.
     Returns a tuple of (fig, ax) for convenience.
     """
+    if detail not in DETAIL_LEVELS:
+        raise ValueError(f"detail must be one of {DETAIL_LEVELS}, got {detail!r}")
     ax.clear()
     N, rooms, conns, start = normalize_map(map_json)
+    door_labels = detail == "full" or (detail == "auto" and N <= DOOR_LABEL_MAX_ROOMS)
+    self_loops = detail == "full" or (detail == "auto" and N <= SELF_LOOP_MAX_ROOMS)
     pos = layout_positions(N, radius=max(4.0, 2.0 + 0.6 * N))
 
     r_hex = 1.0
-    door_anchor = {}  # (room, door) -> (x,y,angle)
+    if anchors is None:
+        anchors = door_anchors(pos, r_room=r_hex * 1.2)
+    # (x, y, angle) of door d in room q at door_anchor[q * 6 + d]
+    door_anchor = anchors.reshape(-1, 3)
+    rasterized = 6 * N + len(conns) > RASTERIZE_MIN_ITEMS
+    # All rooms go into one PolyCollection: (N, 6, 2) vertices by broadcasting
+    ax.add_collection(
+        PolyCollection(
+            hex_vertices(pos, r_hex),
+            facecolors="none",
+            edgecolors="black",
+            linewidths=np.where(np.arange(N) == start, 3.0, 1.5),
+            rasterized=rasterized,
+        )
+    )
     for q in range(N):
         cx, cy = pos[q]
-        draw_hex(ax, cx, cy, rooms[q], q, start=(q == start), r_hex=r_hex)
-        for d in range(6):
-            ax_x, ax_y, ang = hex_door_anchor(cx, cy, d, r_room=r_hex * 1.2)
-            door_anchor[(q, d)] = (ax_x, ax_y, ang)
-            ax.text(ax_x, ax_y, str(d), ha="center", va="center", fontsize=8)
-
-    # Curved connections
-    drawn = set()
-    for item in conns:
-        qa = int(item["from"]["room"])
-        da = int(item["from"]["door"])
-        qb = int(item["to"]["room"])
-        db = int(item["to"]["door"])
-        key = tuple(sorted([(qa, da), (qb, db)]))
-        if key in drawn:
-            continue
-        drawn.add(key)
-        a = door_anchor.get((qa, da))
-        b = door_anchor.get((qb, db))
-        if a is None or b is None:
-            continue
-        (x1, y1, aang) = a
-        (x2, y2, bang) = b
-        if abs(x1 - x2) < 1e-8 and abs(y1 - y2) < 1e-8:
-            draw_self_loop(ax, (x1, y1), aang)
-        else:
-            draw_connection_curved(ax, (x1, y1), (x2, y2), qa, da, qb, db)
+        ax.text(cx, cy, f"{q}\n[{rooms[q]}]", ha="center", va="center", fontsize=10)
+    if door_labels:
+        # 6N door numbers as one collection of cached glyph outlines. Offsets are
+        # in q * 6 + d order and a collection cycles its paths, so offset i gets
+        # digit i % 6; sizes=[8**2] scales the 1pt glyphs to 8pt like fontsize=8.
+        ax.add_collection(
+            PathCollection(
+                _door_digit_paths(),
+                sizes=[8**2],
+                offsets=anchors[:, :, :2].reshape(-1, 2),
+                offset_transform=ax.transData,
+                # the glyphs are sized in pixels (as scatter markers), not data units
+                transform=IdentityTransform(),
+                facecolors="black",
+                edgecolors="none",
+                zorder=3,
+                clip_on=False,  # like ax.text, labels past the axes edge still show
+            ),
+            autolim=False,
+        )
+
+    # Curved connections, sampled into a single LineCollection. The whole pass runs
+    # on int columns of the edges instead of one Python step per connection.
+    ends = map_edges(conns, N)
+    a = door_anchor[ends[:, 0] * 6 + ends[:, 1]]
+    b = door_anchor[ends[:, 2] * 6 + ends[:, 3]]
+    loop = (np.abs(a[:, 0] - b[:, 0]) < 1e-8) & (np.abs(a[:, 1] - b[:, 1]) < 1e-8)
+    if self_loops:
+        for x, y, ang in a[loop].tolist():
+            draw_self_loop(ax, (x, y), ang)
+    if not loop.all():
+        ends, a, b = ends[~loop], a[~loop, :2], b[~loop, :2]
+        rad = pick_rad_batch(ends[:, 0], ends[:, 1], ends[:, 2], ends[:, 3], a, b)
+        ax.add_collection(
+            LineCollection(
+                arc3_curves(a, b, rad), colors="black", linewidths=1.6, zorder=1, rasterized=rasterized
+            )
+        )
 
     ax.set_aspect("equal", adjustable="datalim")
     ax.set_axis_off()
-    ax.relim()
+    # add_collection already grew the data limits; relim() would drop collections
     ax.autoscale_view()
     return ax.figure, ax
 
 
-def visualize_map(map_json, output=None, figsize=(8, 8)):
-    fig, ax = plt.subplots(figsize=figsize)
-    draw_map_on_axes(ax, map_json)
+def draw_map_datashader(ax, map_json, dpi=None):
+    """Rasterize a map's rooms and connections into a single AxesImage with datashader.
+
+    For very large maps, where one artist per label is too slow to draw: the
+    cost is in pixels, not rooms. Room labels, door numbers and self loops are
+    left out. The canvas matches the axes size at dpi (default: the figure's).
+    Requires datashader and pandas. Returns a tuple of (fig, ax) like
+    draw_map_on_axes.
+    """
+    import datashader as ds
+    import datashader.transfer_functions as tf
+    import pandas as pd
+
+    ax.clear()
+    N, rooms, conns, start = normalize_map(map_json)
+    pos = layout_positions(N, radius=max(4.0, 2.0 + 0.6 * N))
+    door_anchor = door_anchors(pos, r_room=1.2).reshape(-1, 3)
+    ends = map_edges(conns, N)
+    a = door_anchor[ends[:, 0] * 6 + ends[:, 1], :2]
+    b = door_anchor[ends[:, 2] * 6 + ends[:, 3], :2]
+    keep = (np.abs(a[:, 0] - b[:, 0]) >= 1e-8) | (np.abs(a[:, 1] - b[:, 1]) >= 1e-8)
+    ends, a, b = ends[keep], a[keep], b[keep]
+    rad = pick_rad_batch(ends[:, 0], ends[:, 1], ends[:, 2], ends[:, 3], a, b)
+    hexes = hex_vertices(pos)
+    # closed hexagon outlines and the sampled arc3 curves as one NaN-separated
+    # polyline, which datashader's line aggregation splits at the NaNs
+    polylines = [np.concatenate([hexes, hexes[:, :1]], axis=1), arc3_curves(a, b, rad)]
+    pts = np.concatenate(
+        [np.concatenate([p, np.full((len(p), 1, 2), np.nan)], axis=1).reshape(-1, 2) for p in polylines if len(p)]
+    )
+
+    # canvas of the axes' pixel size with square pixels over the data bounds
+    dpi = ax.figure.dpi if dpi is None else dpi
+    w = max(1, int(round(ax.bbox.width / ax.figure.dpi * dpi)))
+    h = max(1, int(round(ax.bbox.height / ax.figure.dpi * dpi)))
+    lo = np.nanmin(pts, axis=0) - 1.0
+    hi = np.nanmax(pts, axis=0) + 1.0
+    scale = max((hi[0] - lo[0]) / w, (hi[1] - lo[1]) / h)
+    mid = (lo + hi) / 2
+    x_range = (mid[0] - scale * w / 2, mid[0] + scale * w / 2)
+    y_range = (mid[1] - scale * h / 2, mid[1] + scale * h / 2)
+
+    cvs = ds.Canvas(plot_width=w, plot_height=h, x_range=x_range, y_range=y_range)
+    agg = cvs.line(pd.DataFrame({"x": pts[:, 0], "y": pts[:, 1]}), "x", "y", agg=ds.count())
+    # every covered pixel opaque black, then thickened by a pixel for legibility
+    img = tf.spread(tf.shade(agg, cmap=["black"], min_alpha=255), px=1)
+    # packed RGBA uint32 with row 0 at y_range[0]
+    rgba = np.ascontiguousarray(img.data).view(np.uint8).reshape(h, w, 4)
+    ax.imshow(rgba, extent=(*x_range, *y_range), origin="lower", interpolation="nearest")
+    ax.set_aspect("equal")
+    ax.set_axis_off()
+    return ax.figure, ax
+
+
+def visualize_map(
+    map_json, output=None, figsize=(8, 8), crop_factor=1.0, ax=None, detail="auto", backend="matplotlib"
+):
+    """Draw a map and optionally save it at 220 / crop_factor dpi (figsize is kept).
+
+    Pass the ax returned by a previous call to redraw into the same figure when
+    rendering many maps, instead of creating a new figure each time (figsize is
+    then ignored). The CLI draws a single map and always makes its own.
+    backend is one of BACKENDS; the datashader one ignores detail.
+    """
+    if crop_factor <= 0:
+        raise ValueError(f"crop_factor must be positive, got {crop_factor}")
+    if backend not in BACKENDS:
+        raise ValueError(f"backend must be one of {BACKENDS}, got {backend!r}")
+    if ax is None:
+        fig, ax = plt.subplots(figsize=figsize)
+    else:
+        fig = ax.figure
+    # both renderers clear ax first
+    if backend == "datashader":
+        draw_map_datashader(ax, map_json, dpi=220 / crop_factor if output else None)
+    else:
+        draw_map_on_axes(ax, map_json, detail=detail)
     if output:
-        plt.savefig(output, bbox_inches="tight", dpi=220)
+        # the SVG/PDF writers reject pil_kwargs, so pass them for PNG only
+        extra = {"pil_kwargs": PNG_PIL_KWARGS} if output.lower().endswith(".png") else {}
+        fig.savefig(output, bbox_inches="tight", dpi=220 / crop_factor, **extra)
     return fig, ax
 
 
@@ -151,27 +339,61 @@ def list_sequence_files(pattern: str) -> List[str]:
 
 
 def load_json(path: str):
+    """Parse a JSON file, with orjson when it is installed (same result, faster)."""
+    if orjson is not None:
+        with open(path, "rb") as f:
+            return orjson.loads(f.read())
     with open(path, "r", encoding="utf-8") as f:
         return json.load(f)
 
 
-def interactive_browse(files: List[str], figsize: Tuple[float, float] = (8, 8)):
+def interactive_browse(files: List[str], figsize: Tuple[float, float] = (8, 8), detail: str = "auto"):
     """Open a window and allow stepping through frames with arrow keys.
 
     Keys: left/right (or 'p'/'n'), space=next, home/end, 'q' to close.
+    Each file is parsed once, and a frame seen before is blitted back from a
+    pixel snapshot instead of being redrawn.
     """
     if not files:
         raise ValueError("No input files to browse.")
     fig, ax = plt.subplots(figsize=figsize)
-    state = {"idx": 0}
+    # "drawn" is the frame whose artists are on the axes (a blitted snapshot may show another)
+    state = {"idx": 0, "drawn": None}
+    maps: Dict[int, dict] = {}
+    bitmaps: Dict[int, object] = {}
+
+    def draw_frame(i):
+        if i not in maps:
+            maps[i] = load_json(files[i])
+        draw_map_on_axes(ax, maps[i], detail=detail)
+        fig.suptitle(f"{i+1}/{len(files)}: {os.path.basename(files[i])}")
+        state["drawn"] = i
 
     def render():
         i = state["idx"]
-        m = load_json(files[i])
-        draw_map_on_axes(ax, m)
-        fig.suptitle(f"{i+1}/{len(files)}: {os.path.basename(files[i])}")
+        if i in bitmaps:
+            fig.canvas.restore_region(bitmaps[i])
+            fig.canvas.blit(fig.bbox)
+            return
+        draw_frame(i)
         fig.canvas.draw_idle()
 
+    def on_draw(event):
+        i = state["idx"]
+        if state["drawn"] != i:
+            # a full redraw (e.g. expose) while a snapshot was shown: bring the axes up to date
+            draw_frame(i)
+            fig.canvas.draw_idle()
+            return
+        if fig.canvas.supports_blit:
+            bitmaps[i] = fig.canvas.copy_from_bbox(fig.bbox)
+            if len(bitmaps) > BROWSE_CACHE_FRAMES:
+                bitmaps.pop(next(iter(bitmaps)))
+
+    def on_resize(event):
+        # snapshots are only valid for the canvas size they were taken at
+        bitmaps.clear()
+
     def on_key(event):
         key = (event.key or "").lower()
         if key in ("right", " ", "n"):
@@ -190,36 +412,94 @@ def interactive_browse(files: List[str], figsize: Tuple[float, float] = (8, 8)):
             plt.close(fig)
 
     fig.canvas.mpl_connect("key_press_event", on_key)
+    fig.canvas.mpl_connect("draw_event", on_draw)
+    fig.canvas.mpl_connect("resize_event", on_resize)
     render()
     plt.show()
 
 
+def _new_frame_figure(figsize: Tuple[float, float], dpi: float):
+    """Figure reused for export_animation frames; returns (fig, ax, has_agg)."""
+    fig, ax = plt.subplots(figsize=figsize, dpi=dpi)
+    # Ensure an Agg canvas for consistent pixel buffer access
+    try:
+        from matplotlib.backends.backend_agg import FigureCanvasAgg  # type: ignore
+
+        FigureCanvasAgg(fig)  # attaches an Agg canvas to the figure
+        has_agg = True
+    except Exception:
+        has_agg = False
+    return fig, ax, has_agg
+
+
+def _draw_animation_frame(
+    fig, ax, i: int, path: str, total: int, save_frames_dir: Optional[str], detail: str = "auto"
+):
+    m = load_json(path)
+    draw_map_on_axes(ax, m, detail=detail)
+    fig.suptitle(f"{i+1}/{total}: {os.path.basename(path)}")
+    # Save individual frame if requested
+    if save_frames_dir:
+        out_png = os.path.join(save_frames_dir, f"frame-{i:06d}.png")
+        fig.savefig(out_png, bbox_inches="tight", dpi=220, pil_kwargs=PNG_PIL_KWARGS)
+
+
+def _frame_rgb(fig, has_agg: bool) -> np.ndarray:
+    """Render the canvas and return its pixels as an (h, w, 3) RGB array view."""
+    fig.canvas.draw()
+    w, h = fig.canvas.get_width_height()
+    if has_agg and hasattr(fig.canvas, "buffer_rgba"):
+        # Agg backend: reliable RGBA buffer
+        buf = fig.canvas.buffer_rgba()
+        return np.frombuffer(buf, dtype=np.uint8).reshape((h, w, 4))[:, :, :3]
+    elif hasattr(fig.canvas, "tostring_rgb"):
+        buf = fig.canvas.tostring_rgb()
+        return np.frombuffer(buf, dtype=np.uint8).reshape((h, w, 3))
+    else:
+        # Fallback for backends providing ARGB only
+        buf = fig.canvas.tostring_argb()
+        tmp = np.frombuffer(buf, dtype=np.uint8).reshape((h, w, 4))
+        # ARGB -> RGB by dropping alpha and reordering
+        return tmp[:, :, 1:4]
+
+
+# Figure of each export_animation worker process, keyed by (figsize, dpi)
+_worker_figures: Dict[Tuple[Tuple[float, float], float], tuple] = {}
+
+
+def _render_frame(job) -> Optional[np.ndarray]:
+    """Worker for export_animation(workers > 1): draw one frame and return its RGB pixels if asked."""
+    i, path, total, figsize, frame_dpi, save_frames_dir, detail, grab = job
+    key = (figsize, frame_dpi)
+    if key not in _worker_figures:
+        _worker_figures[key] = _new_frame_figure(figsize, frame_dpi)
+    fig, ax, has_agg = _worker_figures[key]
+    _draw_animation_frame(fig, ax, i, path, total, save_frames_dir, detail)
+    # copy: the result is pickled only once the whole chunk is rendered, after the canvas buffer was reused
+    return _frame_rgb(fig, has_agg).copy() if grab else None
+
+
 def export_animation(
     files: List[str],
     output_path: str,
     figsize: Tuple[float, float] = (8, 8),
     fps: float = 2.0,
     save_frames_dir: Optional[str] = None,
+    workers: int = 1,
+    frame_dpi: float = 100,
+    detail: str = "auto",
 ):
     """Export an animation from a sequence of map jsons.
 
     Supports .gif natively. Attempts .apng if Pillow supports it; otherwise
     falls back to saving per-frame PNGs when save_frames_dir is provided.
+    With ``workers > 1`` frames are rendered in a process pool and stitched
+    back in order. Animation frames are rasterized at ``frame_dpi``; the
+    per-frame PNGs in save_frames_dir keep their own 220 dpi.
     """
     if not files:
         raise ValueError("No input files to animate.")
 
-    # Prepare figure reused for each frame
-    fig, ax = plt.subplots(figsize=figsize)
-    # Ensure an Agg canvas for consistent pixel buffer access
-    try:
-        from matplotlib.backends.backend_agg import FigureCanvasAgg  # type: ignore
-
-        FigureCanvasAgg(fig)  # attaches an Agg canvas to the figure
-        has_agg = True
-    except Exception:
-        has_agg = False
-
     # Optionally save frames individually
     if save_frames_dir:
         os.makedirs(save_frames_dir, exist_ok=True)
@@ -228,72 +508,57 @@ def export_animation(
     pil_ok = False
     try:
         from PIL import Image
-        import numpy as np
 
         pil_ok = True
     except Exception:
         Image = None  # type: ignore
-        np = None  # type: ignore
-
-    frames = []
-    for i, path in enumerate(files):
-        m = load_json(path)
-        draw_map_on_axes(ax, m)
-        fig.suptitle(f"{i+1}/{len(files)}: {os.path.basename(path)}")
-        # Save individual frame if requested
-        if save_frames_dir:
-            out_png = os.path.join(save_frames_dir, f"frame-{i:06d}.png")
-            fig.savefig(out_png, bbox_inches="tight", dpi=220)
-
-        if pil_ok:
-            # Render canvas and grab a pixel buffer
-            fig.canvas.draw()
-            w, h = fig.canvas.get_width_height()
-            if has_agg and hasattr(fig.canvas, "buffer_rgba"):
-                # Agg backend: reliable RGBA buffer
-                buf = fig.canvas.buffer_rgba()
-                tmp = np.frombuffer(buf, dtype=np.uint8).reshape((h, w, 4))
-                arr = tmp[:, :, :3].copy()  # RGBA -> RGB
-            elif hasattr(fig.canvas, "tostring_rgb"):
-                buf = fig.canvas.tostring_rgb()
-                arr = np.frombuffer(buf, dtype=np.uint8).reshape((h, w, 3))
-            else:
-                # Fallback for backends providing ARGB only
-                buf = fig.canvas.tostring_argb()
-                tmp = np.frombuffer(buf, dtype=np.uint8).reshape((h, w, 4))
-                # ARGB -> RGB by dropping alpha and reordering
-                arr = tmp[:, :, 1:4].copy()
-            frames.append(Image.fromarray(arr, mode="RGB"))
-
-    # Attempt to save animation if PIL available
+
+    def render_frames(grab: bool):
+        """Draw each file in turn, saving per-frame PNGs and yielding RGB images if grab."""
+        if workers > 1:
+            jobs = [
+                (i, path, len(files), figsize, frame_dpi, save_frames_dir, detail, grab)
+                for i, path in enumerate(files)
+            ]
+            with ProcessPoolExecutor(max_workers=workers) as procs:
+                for arr in procs.map(_render_frame, jobs, chunksize=4):
+                    yield Image.fromarray(arr, mode="RGB") if grab else None
+            return
+        # Prepare figure reused for each frame
+        fig, ax, has_agg = _new_frame_figure(figsize, frame_dpi)
+        for i, path in enumerate(files):
+            _draw_animation_frame(fig, ax, i, path, len(files), save_frames_dir, detail)
+            # fromarray copies the RGB view out of the canvas buffer
+            yield Image.fromarray(_frame_rgb(fig, has_agg), mode="RGB") if grab else None
+
+    # Attempt to save animation if PIL available. GIF frames are rendered lazily
+    # while Pillow writes the file, so they are never all held as RGB images.
     ext = os.path.splitext(output_path)[1].lower()
-    if pil_ok and frames:
+    fmt = {".gif": "GIF", ".apng": "PNG", ".png": "PNG"}.get(ext)
+    frames = render_frames(grab=pil_ok and fmt is not None)
+    if pil_ok and fmt is not None:
         duration_ms = int(1000.0 / max(1e-9, fps))
-        if ext == ".gif":
-            frames[0].save(
+        first = next(frames)
+        # Pillow's PNG writer walks append_images twice, so APNG still needs a list
+        rest = frames if fmt == "GIF" else list(frames)
+        try:
+            first.save(
                 output_path,
                 save_all=True,
-                append_images=frames[1:],
+                append_images=rest,
                 duration=duration_ms,
                 loop=0,
                 optimize=False,
+                format=fmt,
             )
             return
-        elif ext in (".apng", ".png"):
-            try:
-                frames[0].save(
-                    output_path,
-                    save_all=True,
-                    append_images=frames[1:],
-                    duration=duration_ms,
-                    loop=0,
-                    optimize=False,
-                    format="PNG",
-                )
-                return
-            except Exception:
-                # Fall through to frame dump if not supported
-                pass
+        except Exception:
+            if fmt == "GIF":
+                raise
+            # Fall through to frame dump if not supported
+    # Render whatever is left so every per-frame PNG gets written
+    for _ in frames:
+        pass
 
     # If we get here, we couldn't write the requested animation directly
     if not save_frames_dir:
@@ -333,10 +598,47 @@ def main():
         help="Directory to save per-frame PNGs when animating",
     )
     ap.add_argument("--fps", type=float, default=2.0, help="Animation FPS")
+    ap.add_argument(
+        "--workers",
+        "-j",
+        type=int,
+        default=1,
+        help="Processes rendering animation frames (default: 1)",
+    )
+    ap.add_argument(
+        "--frame-dpi",
+        type=float,
+        default=100,
+        help="DPI of animation frames (default: 100; --save-frames PNGs use 220)",
+    )
     ap.add_argument("--figsize", default="8,8", help="figure size W,H")
+    ap.add_argument(
+        "--detail",
+        choices=DETAIL_LEVELS,
+        default="auto",
+        help=(
+            f"full, rooms-only (no door numbers or self loops), or auto: drop door numbers"
+            f" above {DOOR_LABEL_MAX_ROOMS} rooms and self loops above {SELF_LOOP_MAX_ROOMS}"
+        ),
+    )
+    ap.add_argument(
+        "--backend",
+        choices=BACKENDS,
+        default="matplotlib",
+        help="Renderer for --input: matplotlib, or datashader for very large maps (needs datashader and pandas)",
+    )
+    ap.add_argument(
+        "--crop-factor",
+        type=float,
+        default=1.0,
+        help="Divide the --output dpi (220) by this factor; figure size is unchanged",
+    )
     args = ap.parse_args()
 
     W, H = [float(x) for x in args.figsize.split(",")]
+    if args.output or args.animate_output:
+        # Only writing files: use Agg instead of resolving and starting a GUI backend
+        matplotlib.use("Agg")
 
     if args.animate_output or args.glob:
         if not args.glob:
@@ -351,20 +653,29 @@ def main():
                 figsize=(W, H),
                 fps=args.fps,
                 save_frames_dir=args.save_frames,
+                workers=args.workers,
+                frame_dpi=args.frame_dpi,
+                detail=args.detail,
             )
         else:
             # Interactive stepping through frames
-            interactive_browse(files, figsize=(W, H))
+            interactive_browse(files, figsize=(W, H), detail=args.detail)
         return
 
     # Single-file mode (default/backward-compatible)
     if not args.input:
         raise SystemExit("Either --input or --glob is required")
 
-    with open(args.input, "r", encoding="utf-8") as f:
-        m = json.load(f)
+    m = load_json(args.input)
 
-    visualize_map(m, output=args.output, figsize=(W, H))
+    visualize_map(
+        m,
+        output=args.output,
+        figsize=(W, H),
+        crop_factor=args.crop_factor,
+        detail=args.detail,
+        backend=args.backend,
+    )
     if not args.output:
         plt.show()
 